@@ -0,0 +1,79 @@
+"""
+Throughput of concurrent tool calls against a stand-in Kubernetes client with fixed latency.
+
+Usage:
+    uv run python -m benchmarks.bench_concurrency [--latency 0.05] [--calls 64]
+"""
+import argparse
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from anyio import CapacityLimiter
+from mcp.server.lowlevel.server import request_ctx
+from mcp.shared.context import RequestContext
+from mcp_server import mcp
+from mcp_server_factory import MCPContext
+from scheme.scheme import Scheme
+
+
+class SlowResource:
+    """Answers every LIST after sleeping, like a blocking urllib3 call would."""
+
+    def __init__(self, latency: float, items: int):
+        self.latency = latency
+        self.kind = "Pod"
+        self.group_version = "v1"
+        self.data = json.dumps(
+            {"metadata": {}, "items": [{"metadata": {"name": f"pod-{i}"}} for i in range(items)]}).encode()
+
+    def get(self, **kwargs):
+        time.sleep(self.latency)
+        return SimpleNamespace(data=self.data)
+
+
+def create_context(latency: float, max_concurrency: int) -> MCPContext:
+    api = SlowResource(latency, items=100)
+    return MCPContext(
+        scheme=Scheme([{"group": "", "version": "v1", "name": "pods", "kind": "Pod", "namespaced": True,
+                        "singular": "pod", "short_names": ["po"], "verbs": ["get", "list"]}]),
+        client=SimpleNamespace(resources=SimpleNamespace(
+            get=lambda **kwargs: api)),
+        limiter=CapacityLimiter(max_concurrency),
+    )
+
+
+async def run(lc: MCPContext, calls: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(i: int) -> None:
+        async with semaphore:
+            request_ctx.set(RequestContext(
+                request_id=i, meta=None, session=None, lifespan_context=lc))  # type: ignore
+            await mcp.call_tool("get_resources", {"resource": "pods", "namespace": "default"})
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call(i) for i in range(calls)))
+    return calls / (time.perf_counter() - start)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="seconds per API call")
+    parser.add_argument("--calls", type=int, default=64)
+    parser.add_argument("--max-concurrency", type=int, default=16,
+                        help="per-cluster limit, as [kubernetes] max_concurrency")
+    args = parser.parse_args()
+
+    lc = create_context(args.latency, args.max_concurrency)
+    print(f"{'CONCURRENCY':<12}{'CALLS/S':>10}{'SPEEDUP':>10}")
+    baseline = None
+    for concurrency in (1, 2, 4, 8, 16, 32):
+        throughput = await run(lc, args.calls, concurrency)
+        baseline = baseline or throughput
+        print(f"{concurrency:<12}{throughput:>10.1f}{throughput / baseline:>9.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""
+Cost of resolving the `DynamicResource` of a resource, per tool call, with and without the scheme's handle cache.
+
+Discovery of the fake API server lists `--resources` resources, as many as a cluster with a few operators.
+
+Usage:
+    uv run python -m benchmarks.bench_handles [--resources 300] [--lookups 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.fake_apiserver import FakeApiServer
+
+
+def per_lookup(lookup, lookups: int) -> float:
+    """Microseconds per call, after a first call which fetches discovery."""
+    lookup()
+    start = time.perf_counter()
+    for _ in range(lookups):
+        lookup()
+    return (time.perf_counter() - start) / lookups * 1_000_000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resources", type=int, default=300, help="resources listed by discovery")
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    with FakeApiServer(extra_resources=args.resources) as server, tempfile.TemporaryDirectory() as tmp:
+        kubeconfig = Path(tmp) / "kubeconfig"
+        server.write_kubeconfig(kubeconfig)
+        os.environ["DYNACONF_KUBERNETES__KUBECONFIG"] = str(kubeconfig)
+        os.environ["DYNACONF_KUBERNETES__DISCOVERY__SNAPSHOT_DIR"] = tmp
+        # Imported once the environment points them to the fake API server
+        from kubernetes.dynamic import DynamicClient  # type: ignore
+        from scheme.scheme import load_scheme
+        from utils.clients import create_api_client
+
+        api_client = create_api_client()
+        scheme = load_scheme(api_client)
+        client = DynamicClient(api_client)
+        gvk = scheme["pods"].gvk
+
+        before = per_lookup(lambda: client.resources.get(api_version=gvk.api_version, kind=gvk.kind), args.lookups)
+        after = per_lookup(lambda: scheme.handle(client, "pods"), args.lookups)
+        # A tool call also resolves the name it was given
+        resolved = per_lookup(lambda: scheme.handle(client, scheme.resolve("po")), args.lookups)  # type: ignore
+
+    print(f"{len(scheme)} API resources")
+    print(f"{'LOOKUP':<32}{'PER CALL':>12}")
+    print(f"{'client.resources.get':<32}{before:>10.2f}us")
+    print(f"{'scheme.handle':<32}{after:>10.2f}us{before / after:>8.0f}x")
+    print(f"{'scheme.resolve + handle':<32}{resolved:>10.2f}us{before / resolved:>8.0f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
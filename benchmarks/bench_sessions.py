@@ -0,0 +1,114 @@
+"""
+Client sessions one SSE server process sustains per core, against a stand-in Kubernetes client with fixed latency.
+
+Spawns the server with a shared stand-in context, then opens more and more concurrent sessions,
+each listing pods in a loop, and measures the CPU time the server spends per call.
+
+Usage:
+    uv run python -m benchmarks.bench_sessions [--latency 0.05] [--calls 16] [--rate 0.5]
+"""
+import argparse
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+from contextlib import AsyncExitStack
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.server.fastmcp import FastMCP
+
+
+async def serve(port: int, latency: float, max_concurrency: int) -> None:
+    from benchmarks.bench_concurrency import create_context
+    from mcp_server import mcp
+
+    @mcp.tool()
+    async def cpu_time() -> str:
+        """CPU seconds used by the server process so far."""
+        return str(time.process_time())
+
+    mcp.settings.port = port
+    mcp.settings.log_level = "WARNING"
+    mcp.shared_context = create_context(latency, max_concurrency)
+    # Serve the stand-in context instead of creating one for a real cluster
+    await FastMCP.run_sse_async(mcp)
+
+
+async def cpu_time(session: ClientSession) -> float:
+    result = await session.call_tool("cpu_time", {})
+    return float(result.content[0].text)  # type: ignore
+
+
+async def run(url: str, sessions: int, calls: int) -> tuple[float, float]:
+    async with AsyncExitStack() as stack:
+        clients = []
+        for _ in range(sessions):
+            read, write = await stack.enter_async_context(sse_client(url))
+            session = await stack.enter_async_context(ClientSession(read, write))
+            await session.initialize()
+            clients.append(session)
+
+        async def loop(session: ClientSession) -> None:
+            for _ in range(calls):
+                await session.call_tool("get_resources", {"resource": "pods", "namespace": "default"})
+
+        cpu = await cpu_time(clients[0])
+        start = time.perf_counter()
+        await asyncio.gather(*(loop(session) for session in clients))
+        elapsed = time.perf_counter() - start
+        cpu = await cpu_time(clients[0]) - cpu
+    return sessions * calls / elapsed, cpu / (sessions * calls)
+
+
+async def wait_for_port(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise TimeoutError(f"Server did not listen on port {port}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="seconds per API call")
+    parser.add_argument("--calls", type=int, default=16,
+                        help="calls per session")
+    parser.add_argument("--rate", type=float, default=0.5,
+                        help="tool calls per second of one agent, to estimate sessions per core")
+    parser.add_argument("--max-concurrency", type=int, default=16,
+                        help="per-cluster limit, as [kubernetes] max_concurrency")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        await serve(args.port, args.latency, args.max_concurrency)
+        return
+
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_sessions", "--serve",
+                               "--port", str(args.port), "--latency", str(args.latency),
+                               "--max-concurrency", str(args.max_concurrency)])
+    try:
+        await wait_for_port(args.port)
+        url = f"http://127.0.0.1:{args.port}/sse"
+        print(f"{'SESSIONS':<10}{'CALLS/S':>10}{'CPU/CALL':>12}{'SESSIONS/CORE':>15}")
+        for sessions in (1, 4, 16, 64):
+            throughput, cpu_per_call = await run(url, sessions, args.calls)
+            per_core = 1 / (cpu_per_call * args.rate) if cpu_per_call else float("inf")
+            print(f"{sessions:<10}{throughput:>10.1f}{cpu_per_call * 1000:>10.2f}ms{per_core:>15.0f}")
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            # Graceful shutdown waits for SSE streams which never end
+            server.kill()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+"""
+Cold start of the MCP server over stdio against a fake API server, failing when it exceeds its budget.
+
+Measures the import time of `mcp_server` with `-X importtime`, then spawns the server the way
+the client does and times `initialize` and the first tool call. Exits with status 1 if the median
+import or initialize time is over budget, or if a module which should be deferred is imported eagerly.
+
+Usage:
+    uv run python -m benchmarks.bench_startup [--runs 5] [--import-budget 2500] [--initialize-budget 3000]
+"""
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from benchmarks.fake_apiserver import FakeApiServer
+
+
+ROOT_DIR = Path(__file__).parent.parent
+
+# Only needed by some tools, so importing them is deferred to their first use
+DEFERRED_MODULES = ("langchain", "langchain_core", "openai")
+
+IMPORT_TIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)$")
+
+
+def measure_imports() -> tuple[float, dict[str, float]]:
+    """Import `mcp_server` in a fresh interpreter, return its total and the time spent in each top-level package, in ms."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import mcp_server"],
+                            cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    total = 0.0
+    packages: dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not (m := IMPORT_TIME.match(line)):
+            continue
+        own, cumulative, module = int(m[1]) / 1000, int(m[2]) / 1000, m[3]
+        if module == "mcp_server":
+            total = cumulative
+        package = module.split(".")[0]
+        packages[package] = packages.get(package, 0) + own
+    return total, packages
+
+
+async def measure_initialize(env: dict[str, str]) -> tuple[float, float]:
+    """Spawn the server over stdio, return the time to `initialize` and to the first tool result, in ms."""
+    params = StdioServerParameters(command=sys.executable, args=[str(ROOT_DIR / "mcp_server.py")], env=env)
+    start = time.perf_counter()
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            initialized = time.perf_counter()
+            await session.call_tool("get_resources", {"resource": "pods", "namespace": "default"})
+            first_tool = time.perf_counter()
+    return (initialized - start) * 1000, (first_tool - start) * 1000
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    # Measured under -X importtime, which slows imports down. Most of it is mcp, kubernetes and the first
+    # read of the config, which the lifespan needs before initialize anyway.
+    parser.add_argument("--import-budget", type=float, default=2500,
+                        help="ms, median import time of mcp_server")
+    parser.add_argument("--initialize-budget", type=float, default=3000,
+                        help="ms, median time from spawning the server to initialize")
+    args = parser.parse_args()
+
+    failures = []
+
+    imports = [measure_imports() for _ in range(args.runs)]
+    import_time = statistics.median(total for total, _ in imports)
+    print(f"Import mcp_server: {import_time:.0f}ms (budget {args.import_budget:.0f}ms)")
+    for package, ms in sorted(imports[-1][1].items(), key=lambda item: -item[1])[:8]:
+        print(f"  {package:<24}{ms:>8.0f}ms")
+    if import_time > args.import_budget:
+        failures.append(f"import time {import_time:.0f}ms is over budget")
+    if eager := sorted(set(imports[-1][1]) & set(DEFERRED_MODULES)):
+        failures.append(f"{', '.join(eager)} imported eagerly")
+
+    with FakeApiServer() as server, tempfile.TemporaryDirectory() as tmp:
+        kubeconfig = Path(tmp) / "kubeconfig"
+        server.write_kubeconfig(kubeconfig)
+        env = {
+            **os.environ,
+            "DYNACONF_KUBERNETES__KUBECONFIG": str(kubeconfig),
+            "DYNACONF_MCP__LOG_LEVEL": "WARNING",
+        }
+        timings = []
+        for run in range(args.runs):
+            # A fresh snapshot directory each run, so every start is cold
+            env["DYNACONF_KUBERNETES__DISCOVERY__SNAPSHOT_DIR"] = str(Path(tmp) / f"snapshot-{run}")
+            timings.append(await measure_initialize(env))
+    initialize_time = statistics.median(initialize for initialize, _ in timings)
+    first_tool_time = statistics.median(first_tool for _, first_tool in timings)
+    print(f"Initialize: {initialize_time:.0f}ms (budget {args.initialize_budget:.0f}ms)")
+    print(f"First tool result: {first_tool_time:.0f}ms")
+    if initialize_time > args.initialize_budget:
+        failures.append(f"initialize time {initialize_time:.0f}ms is over budget")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,215 @@
+"""
+Latency, throughput, memory and bytes of each tool, offline, through the real MCP stdio path.
+
+Spawns the server over stdio against a fake API server listing `--objects` pods and a fake
+OpenAI-compatible endpoint, then calls each tool `--calls` times. Save the results of a commit
+with `--save`, and compare against them later with `--baseline`, which exits with status 1 when
+a scenario got slower by more than `--tolerance`.
+
+Usage:
+    uv run python -m benchmarks.bench_tools [--objects 10000] [--calls 50] [--concurrency 4]
+    uv run python -m benchmarks.bench_tools --save baseline.json
+    uv run python -m benchmarks.bench_tools --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from benchmarks.fake_apiserver import FakeApiServer
+from benchmarks.fake_llm import FakeLLM
+
+
+ROOT_DIR = Path(__file__).parent.parent
+
+# Manifest the fake LLM converts natural language into
+LLM_MANIFEST = json.dumps({"apiVersion": "v1", "kind": "Pod", "metadata": {"name": "nginx-llm"},
+                           "spec": {"containers": [{"name": "nginx", "image": "nginx:1.27"}]}})
+
+
+def pod_yaml(name: str) -> str:
+    return f"""apiVersion: v1
+kind: Pod
+metadata:
+  name: {name}
+  labels:
+    app: bench
+spec:
+  containers:
+    - name: nginx
+      image: nginx:1.27
+"""
+
+
+def scenarios(objects: int) -> dict[str, Callable[[int], tuple[str, dict]]]:
+    """Tool name and arguments of the i-th call of each scenario."""
+    namespace = "default"
+    return {
+        "get_resources": lambda i: ("get_resources", {
+            "resource": "pods", "namespace": namespace, "limit": 500, "max_items": objects}),
+        "get_resources_columns": lambda i: ("get_resources", {
+            "resource": "pods", "namespace": namespace, "limit": 500, "max_items": objects,
+            "columns": "status,node,restarts"}),
+        "get_resource": lambda i: ("get_resource", {
+            "resource": "pods", "name": f"pod-{i % objects}", "namespace": namespace}),
+        "create_resource": lambda i: ("create_resource", {
+            "resource": "pods", "manifest_yaml": pod_yaml(f"bench-{i}"), "namespace": namespace}),
+        "create_resource_llm": lambda i: ("create_resource", {
+            "resource": "pods", "manifest_yaml": f"a pod named llm-{i} running nginx", "namespace": namespace}),
+        "update_resource": lambda i: ("update_resource", {
+            "resource": "pods", "name": f"pod-{i % objects}", "namespace": namespace,
+            "patch": {"metadata": {"labels": {"bench": str(i)}}}}),
+        "apply_resources": lambda i: ("apply_resources", {
+            "manifests": pod_yaml(f"apply-{i}"), "namespace": namespace}),
+        "delete_resource": lambda i: ("delete_resource", {
+            "resource": "pods", "name": f"pod-{i % objects}", "namespace": namespace}),
+    }
+
+
+async def serve() -> None:
+    from mcp_server import mcp
+
+    @mcp.tool()
+    async def bench_stats() -> str:
+        """Peak RSS of the server process in bytes."""
+        # ru_maxrss is in kilobytes on Linux, bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        return str(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale)
+
+    await mcp.run_stdio_async()
+
+
+def percentile(latencies: list[float], p: int) -> float:
+    return statistics.quantiles(latencies, n=100, method="inclusive")[p - 1] if len(latencies) > 1 else latencies[0]
+
+
+async def run_scenario(session: ClientSession, call: Callable[[int], tuple[str, dict]], calls: int, concurrency: int,
+                       servers: tuple[FakeApiServer, FakeLLM]) -> dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    output_bytes = 0
+
+    async def one(i: int) -> None:
+        nonlocal output_bytes
+        name, arguments = call(i)
+        async with semaphore:
+            start = time.perf_counter()
+            result = await session.call_tool(name, arguments)
+            latencies.append(time.perf_counter() - start)
+        if result.isError:
+            raise RuntimeError(f"{name} failed: {result.content}")
+        output_bytes += sum(len(getattr(content, "text", "")) for content in result.content)
+
+    # Warm up connections and caches of the path under test
+    await one(calls)
+    latencies.clear()
+    output_bytes = 0
+
+    upstream_bytes = sum(server.bytes_sent for server in servers)
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    elapsed = time.perf_counter() - start
+    upstream_bytes = sum(server.bytes_sent for server in servers) - upstream_bytes
+
+    rss = await session.call_tool("bench_stats", {})
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "calls_per_s": calls / elapsed,
+        "upstream_kb_per_call": upstream_bytes / calls / 1024,
+        "output_kb_per_call": output_bytes / calls / 1024,
+        "peak_rss_mb": int(rss.content[0].text) / 1024 / 1024,  # type: ignore
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Scenarios slower than the baseline by more than the tolerance, at p50 or p99."""
+    regressions = []
+    for name, metrics in results["scenarios"].items():
+        if not (before := baseline["scenarios"].get(name)):
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            if metrics[metric] > before[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{name} {metric} {before[metric]:.1f} -> {metrics[metric]:.1f} (baseline {baseline.get('commit') or 'n/a'})")
+    return regressions
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--objects", type=int, default=10000, help="pods listed by the fake API server")
+    parser.add_argument("--calls", type=int, default=50, help="calls per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent calls in flight")
+    parser.add_argument("--scenarios", default="", help="comma separated scenarios to run, all if empty")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per fake LLM completion")
+    parser.add_argument("--save", default="", help="write results to this JSON file")
+    parser.add_argument("--baseline", default="", help="compare with results saved by --save")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        await serve()
+        return 0
+
+    selected = {name: call for name, call in scenarios(args.objects).items()
+                if not args.scenarios or name in args.scenarios.split(",")}
+    results: dict = {"commit": git_commit(), "objects": args.objects, "calls": args.calls,
+                     "concurrency": args.concurrency, "scenarios": {}}
+
+    with FakeApiServer(pods=args.objects) as api_server, FakeLLM(LLM_MANIFEST, args.llm_latency) as llm, \
+            tempfile.TemporaryDirectory() as tmp:
+        kubeconfig = Path(tmp) / "kubeconfig"
+        api_server.write_kubeconfig(kubeconfig)
+        env = {
+            **os.environ,
+            "DYNACONF_KUBERNETES__KUBECONFIG": str(kubeconfig),
+            "DYNACONF_KUBERNETES__DISCOVERY__SNAPSHOT_DIR": tmp,
+            "DYNACONF_MCP__LOG_LEVEL": "WARNING",
+            "DYNACONF_SERVER__LLM__MODEL_PROVIDER": "openai",
+            "DYNACONF_SERVER__LLM__BASE_URL": llm.url,
+            "DYNACONF_SERVER__LLM__API_KEY": "fake",
+            "DYNACONF_SERVER__LLM__MODEL": "fake",
+        }
+        params = StdioServerParameters(command=sys.executable, args=["-m", "benchmarks.bench_tools", "--serve"],
+                                       env=env, cwd=ROOT_DIR)
+        async with stdio_client(params) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                print(f"{'SCENARIO':<24}{'P50':>10}{'P99':>10}{'CALLS/S':>10}{'UPSTREAM':>12}{'OUTPUT':>12}{'PEAK RSS':>10}")
+                for name, call in selected.items():
+                    metrics = await run_scenario(session, call, args.calls, args.concurrency, (api_server, llm))
+                    results["scenarios"][name] = metrics
+                    print(f"{name:<24}{metrics['p50_ms']:>8.1f}ms{metrics['p99_ms']:>8.1f}ms{metrics['calls_per_s']:>10.1f}"
+                          f"{metrics['upstream_kb_per_call']:>10.1f}KB{metrics['output_kb_per_call']:>10.1f}KB"
+                          f"{metrics['peak_rss_mb']:>8.0f}MB")
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,234 @@
+"""
+In-process stand-in of a Kubernetes API server, enough to discover, list, get and write pods offline.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+
+__all__ = ("FakeApiServer", )
+
+
+API_RESOURCES = {
+    "kind": "APIResourceList",
+    "groupVersion": "v1",
+    "resources": [
+        {"name": "pods", "singularName": "pod", "namespaced": True, "kind": "Pod", "shortNames": ["po"],
+         "verbs": ["create", "delete", "deletecollection", "get", "list", "patch", "update", "watch"]},
+        {"name": "namespaces", "singularName": "namespace", "namespaced": False, "kind": "Namespace", "shortNames": ["ns"],
+         "verbs": ["create", "delete", "get", "list", "patch", "update", "watch"]},
+    ],
+}
+
+
+def make_pod(i: int, namespace: str) -> dict:
+    return {
+        "apiVersion": "v1",
+        "kind": "Pod",
+        "metadata": {
+            "name": f"pod-{i}",
+            "namespace": namespace,
+            "uid": f"00000000-0000-0000-0000-{i:012d}",
+            "resourceVersion": str(1000 + i),
+            "creationTimestamp": "2025-01-01T00:00:00Z",
+            "labels": {"app": f"app-{i % 10}"},
+        },
+        "spec": {"nodeName": f"node-{i % 3}", "containers": [{"name": "main", "image": "nginx:1.27"}]},
+        "status": {
+            "phase": "Running",
+            "podIP": f"10.0.{i // 256}.{i % 256}",
+            "containerStatuses": [{"name": "main", "ready": True, "restartCount": i % 4}],
+        },
+    }
+
+
+def merge_patch(target: dict, patch: dict) -> dict:
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge_patch(target[key], value)
+        else:
+            target[key] = value
+    return target
+
+
+class FakeApiServer:
+    """
+    Serves /version, legacy discovery of the core group, and pods in one namespace.
+
+    Pods `pod-0` to `pod-{pods - 1}` are generated when listed, so lists of 100k objects cost no memory up front.
+    Writes are acknowledged and kept, but lists stay the same, so that every run lists the same objects.
+    Discovery lists `extra_resources` more resources, which are never served, to size it like a real cluster.
+
+    Usage:
+        with FakeApiServer(pods=500) as server:
+            server.write_kubeconfig(path)
+    """
+
+    def __init__(self, pods: int = 100, namespace: str = "default", port: int = 0, extra_resources: int = 0):
+        self.pods = pods
+        self.api_resources = {**API_RESOURCES, "resources": API_RESOURCES["resources"] + [
+            {"name": f"widgets{i}", "singularName": f"widget{i}", "namespaced": True, "kind": f"Widget{i}",
+             "verbs": ["get", "list"]} for i in range(extra_resources)]}
+        self.namespace = namespace
+        # Pods written by clients, by name
+        self.objects: dict[str, dict] = {}
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self) -> "FakeApiServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def write_kubeconfig(self, path: str | Path) -> None:
+        Path(path).write_text(json.dumps({
+            "apiVersion": "v1",
+            "kind": "Config",
+            "clusters": [{"name": "fake", "cluster": {"server": self.url}}],
+            "users": [{"name": "fake", "user": {"token": "fake"}}],
+            "contexts": [{"name": "fake", "context": {"cluster": "fake", "user": "fake"}}],
+            "current-context": "fake",
+        }))
+
+    def get_pod(self, name: str) -> dict | None:
+        with self._lock:
+            if name in self.objects:
+                return json.loads(json.dumps(self.objects[name]))
+        index = name.removeprefix("pod-")
+        if index.isdigit() and int(index) < self.pods:
+            return make_pod(int(index), self.namespace)
+        return None
+
+    def put_pod(self, obj: dict) -> dict:
+        metadata = obj.setdefault("metadata", {})
+        metadata.setdefault("name", f"{metadata.get('generateName', 'pod-')}{len(self.objects)}")
+        metadata["namespace"] = self.namespace
+        metadata.setdefault("uid", f"ffffffff-0000-0000-0000-{len(self.objects):012d}")
+        metadata.setdefault("creationTimestamp", "2025-01-01T00:00:00Z")
+        with self._lock:
+            metadata["resourceVersion"] = str(10_000_000 + len(self.objects))
+            self.objects[metadata["name"]] = obj
+        return obj
+
+    def list(self, resource: str, query: dict[str, list[str]], metadata_only: bool) -> dict:
+        if resource == "namespaces":
+            total = 1
+            generate = lambda i: {"apiVersion": "v1", "kind": "Namespace", "metadata": {"name": self.namespace}}
+        else:
+            total = self.pods
+            generate = lambda i: make_pod(i, self.namespace)
+        start = int(query.get("continue", ["0"])[0] or 0)
+        end = min(total, start + (int(query.get("limit", ["0"])[0] or 0) or total))
+        metadata: dict = {"resourceVersion": "2000"}
+        if end < total:
+            metadata["continue"] = str(end)
+            metadata["remainingItemCount"] = total - end
+        items = [generate(i) for i in range(start, end)]
+        if metadata_only:
+            return {"apiVersion": "meta.k8s.io/v1", "kind": "PartialObjectMetadataList", "metadata": metadata, "items": [
+                {"apiVersion": "meta.k8s.io/v1", "kind": "PartialObjectMetadata", "metadata": item["metadata"]} for item in items]}
+        return {"apiVersion": "v1", "kind": "List", "metadata": metadata, "items": items}
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately, Nagle's algorithm would delay the body of every response
+            disable_nagle_algorithm = True
+
+            def route(self) -> tuple[str, str]:
+                """Resource and name of a path under /api/v1, empty if it is not one we serve."""
+                parts = urlparse(self.path).path.strip("/").split("/")
+                if parts[:2] != ["api", "v1"]:
+                    return "", ""
+                parts = parts[2:]
+                if parts[:2] == ["namespaces", server.namespace] and len(parts) > 2:
+                    parts = parts[2:]
+                elif len(parts) > 1 and parts[0] == "namespaces":
+                    return "", ""
+                if parts and parts[0] in ("pods", "namespaces") and len(parts) <= 2:
+                    return parts[0], parts[1] if len(parts) == 2 else ""
+                return "", ""
+
+            def read_body(self) -> dict:
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                body: dict | None = None
+                if url.path == "/version":
+                    body = {"major": "1", "minor": "32", "gitVersion": "v1.32.0"}
+                elif url.path == "/api":
+                    body = {"kind": "APIVersions", "versions": ["v1"]}
+                elif url.path == "/apis":
+                    body = {"kind": "APIGroupList", "apiVersion": "v1", "groups": []}
+                elif url.path == "/api/v1":
+                    body = server.api_resources
+                else:
+                    resource, name = self.route()
+                    if resource == "pods" and name:
+                        body = server.get_pod(name)
+                    elif resource:
+                        metadata_only = "as=PartialObjectMetadataList" in self.headers.get("Accept", "")
+                        body = server.list(resource, parse_qs(url.query), metadata_only)
+                self.send_json(200, body)
+
+            def do_POST(self) -> None:
+                resource, name = self.route()
+                self.send_json(201, server.put_pod(self.read_body()) if resource == "pods" and not name else None)
+
+            def do_PATCH(self) -> None:
+                resource, name = self.route()
+                patch = self.read_body()
+                if resource != "pods" or not name:
+                    self.send_json(200, None)
+                elif "apply-patch" in self.headers.get("Content-Type", ""):
+                    self.send_json(200, server.put_pod(merge_patch(server.get_pod(name) or {}, patch)))
+                elif (obj := server.get_pod(name)) is None:
+                    self.send_json(200, None)
+                else:
+                    patch.get("metadata", {}).pop("resourceVersion", None)
+                    self.send_json(200, server.put_pod(merge_patch(obj, patch)))
+
+            def do_DELETE(self) -> None:
+                resource, name = self.route()
+                # Delete options, e.g. preconditions, are accepted and ignored
+                self.read_body()
+                if resource == "pods" and name:
+                    self.send_json(200, server.get_pod(name))
+                else:
+                    self.send_json(200, {"apiVersion": "v1", "kind": "List", "metadata": {}, "items": []} if resource else None)
+
+            def send_json(self, status: int, body: dict | None) -> None:
+                if body is None:
+                    status, body = 404, {"kind": "Status", "apiVersion": "v1", "status": "Failure", "code": 404}
+                data = json.dumps(body).encode()
+                with server._lock:
+                    server.requests += 1
+                    server.bytes_sent += len(data)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *_) -> None:
+                pass
+
+        return Handler
@@ -0,0 +1,91 @@
+"""
+In-process stand-in of an OpenAI-compatible chat completions endpoint answering with a canned message.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+__all__ = ("FakeLLM", )
+
+
+class FakeLLM:
+    """
+    Serves POST /v1/chat/completions, optionally streamed, after a fixed latency.
+
+    Usage:
+        with FakeLLM(content='{"metadata": {"name": "nginx"}}') as llm:
+            base_url = llm.url
+    """
+
+    def __init__(self, content: str, latency: float = 0.0, port: int = 0):
+        self.content = content
+        self.latency = latency
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def __enter__(self) -> "FakeLLM":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def completion(self, model: str) -> dict:
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": self.content}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    def chunks(self, model: str) -> list[dict]:
+        chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+        return [
+            {**chunk, "choices": [{"index": 0, "delta": {"role": "assistant", "content": self.content}, "finish_reason": None}]},
+            {**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]},
+        ]
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        llm = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Close the connection after each response, clients created per call would otherwise leave them idle
+            protocol_version = "HTTP/1.0"
+            # Headers and body are written separately, Nagle's algorithm would delay the body of every response
+            disable_nagle_algorithm = True
+
+            def do_POST(self) -> None:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                time.sleep(llm.latency)
+                model = request.get("model", "fake")
+                if request.get("stream"):
+                    data = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in llm.chunks(model))
+                    data, content_type = (data + "data: [DONE]\n\n").encode(), "text/event-stream"
+                else:
+                    data, content_type = json.dumps(llm.completion(model)).encode(), "application/json"
+                with llm._lock:
+                    llm.requests += 1
+                    llm.bytes_sent += len(data)
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *_) -> None:
+                pass
+
+        return Handler
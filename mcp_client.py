@@ -1,20 +1,33 @@
 from mcp import ClientSession, StdioServerParameters, types
+from mcp.client.sse import sse_client
 from mcp.client.stdio import stdio_client
 from loguru import logger
 import asyncio
 import json
 from dataclasses import dataclass, field
 from openai import AsyncOpenAI
-from openai.types.chat import ChatCompletionMessageParam, ChatCompletionToolParam, ChatCompletionSystemMessageParam
+from openai.types.chat import ChatCompletionMessageParam, ChatCompletionMessageToolCall, ChatCompletionToolParam, ChatCompletionSystemMessageParam
+from openai.types.chat.chat_completion_message_tool_call import Function
 from typing import Any, cast
 from config.config import config
+from utils.history import History
 import sys
+import time
 
 
 logger.configure(
     handlers=[{"sink": sys.stderr, "level": config["mcp"]["log_level"]}])
 
-llm_config = config["client"]["llm"]
+client_config = config["client"]
+llm_config = client_config["llm"]
+history_config = client_config.get("history", {})
+
+# Bounds the agent loop of a query
+max_rounds = client_config.get("max_rounds", 8)
+
+# Tools without side effects, which are safe to run concurrently
+read_only_tools = set(client_config.get(
+    "read_only_tools", ["get_resources", "get_resource", "aggregate_resources"]))
 
 # Initialize OpenAI client
 openai_client = AsyncOpenAI(
@@ -29,10 +42,58 @@ server_params = StdioServerParameters(
     env=None,  # Optional environment variables
 )
 
+# Connect to a running server over SSE instead of spawning one, e.g. http://127.0.0.1:8000/sse
+server_url = client_config.get("server_url", "")
+
+
+@dataclass
+class QueryStats:
+    start: float = field(default_factory=time.perf_counter)
+    # Time to first token in seconds
+    ttft: float | None = None
+    round_trips: int = 0
+    # Time to set up tools in seconds, and whether they were cached
+    tools: tuple[float, bool] = (0.0, False)
+    # Prompt tokens of all round trips as reported by the provider
+    prompt_tokens: int = 0
+    # Estimated tokens of the history before and after compaction
+    history: tuple[int, int] = (0, 0)
+
+    def __str__(self) -> str:
+        ttft = f"{self.ttft * 1000:.0f}ms" if self.ttft is not None else "n/a"
+        tools = f"{self.tools[0] * 1000:.1f}ms{' (cached)' if self.tools[1] else ''}"
+        history = f"{self.history[0]}" + (f" -> {self.history[1]}" if self.history[1] != self.history[0] else "")
+        return (f"Query took {time.perf_counter() - self.start:.2f}s in {self.round_trips} round trips, time to first token {ttft}, "
+                f"tools {tools}, prompt tokens {self.prompt_tokens or 'n/a'}, history ~{history} tokens")
+
+
+async def summarize(messages: list[dict[str, Any]]) -> str:
+    """Summarize earlier turns of the conversation, keeping what follow-up queries may refer to."""
+    transcript = "\n".join(
+        f"{message['role']}: {message.get('content') or ''}"
+        + "".join(f" [called {tool_call['function']['name']}({tool_call['function']['arguments']})]"
+                  for tool_call in message.get("tool_calls") or [])
+        for message in messages
+    )
+    response = await openai_client.chat.completions.create(
+        model=llm_config["model"] or "gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": "Summarize this conversation about Kubernetes resources in a few sentences. "
+             "Keep the names, namespaces and kinds of resources mentioned, and what was done to them."},
+            {"role": "user", "content": transcript},
+        ],
+        temperature=0,
+    )
+    return response.choices[0].message.content or ""
+
 
 @dataclass
 class Chat:
-    messages: list = field(default_factory=list)
+    # Caps concurrent read-only tool calls
+    semaphore: asyncio.Semaphore = field(default_factory=lambda: asyncio.Semaphore(
+        client_config.get("max_concurrency", 4)))
+    # Tools converted to OpenAI schema, None until fetched or once invalidated
+    tools: list[ChatCompletionToolParam] | None = None
 
     # https://platform.openai.com/docs/guides/text?api-mode=chat#message-roles-and-instruction-following
     system_prompt = ChatCompletionSystemMessageParam(
@@ -42,121 +103,202 @@ class Chat:
         Always use plural form of resource name incase user provides singular form or shortnames.""",
     )
 
-    # TODO: Singleton?
+    # Kept across queries so follow-ups can refer to earlier results, compacted when over budget
+    history: History = field(default_factory=lambda: History(
+        dict(Chat.system_prompt),
+        budget=history_config.get("budget", 8000),
+        keep_turns=history_config.get("keep_turns", 2),
+        tool_result_chars=history_config.get("tool_result_chars", 1000),
+        summarize=summarize if history_config.get("summarize", True) else None,
+    ))
+
     async def get_tools(self, session: ClientSession) -> list[ChatCompletionToolParam]:
-        """Set up tools from MCP server."""
-        response = await session.list_tools()
-        return [
-            {
-                "type": "function",
-                "function": {
-                    "name": tool.name,
-                    "description": tool.description or "",
-                    "parameters": tool.inputSchema,
+        """Set up tools from MCP server, cached until the server notifies that the tool list changed."""
+        if self.tools is None:
+            response = await session.list_tools()
+            # Sorted by name with sorted schema keys, so the request prefix is byte-stable
+            # across calls and hits the provider prompt cache
+            self.tools = [
+                {
+                    "type": "function",
+                    "function": {
+                        "name": tool.name,
+                        "description": tool.description or "",
+                        "parameters": json.loads(json.dumps(tool.inputSchema, sort_keys=True)),
+                    }
                 }
-            }
-            for tool in response.tools
+                for tool in sorted(response.tools, key=lambda tool: tool.name)
+            ]
+        return self.tools
+
+    async def handle_message(self, message: Any) -> None:
+        """Handle incoming messages from MCP server."""
+        if isinstance(message, types.ServerNotification) and isinstance(message.root, types.ToolListChangedNotification):
+            logger.debug("Tool list changed, invalidate the cached tools")
+            self.tools = None
+
+    async def call_tool(self, session: ClientSession, tool_call: ChatCompletionMessageToolCall) -> str:
+        """Execute a tool call and return its text result."""
+        function_name = tool_call.function.name
+        logger.debug(f"Executing tool: {function_name}")
+
+        # Validate function arguments
+        try:
+            function_args = json.loads(tool_call.function.arguments)
+            logger.debug(
+                f"Function arguments: {function_args}, type: {type(function_args)}")
+            if not isinstance(function_args, dict):
+                logger.error(
+                    f"Invalid function arguments format: expected dict, got {type(function_args).__name__}")
+                function_args = {}
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse function arguments: {e}")
+            function_args = {}
+
+        # Execute tool call
+        if function_name == "update_resource":
+            logger.debug(
+                f"Value of patch field: {function_args['patch']}")
+            logger.debug(
+                f"Type of patch fields: {type(function_args['patch'])}")
+        result = await session.call_tool(function_name, cast(dict[str, Any], function_args))
+        logger.debug(f"Tool result: {result}")
+        return getattr(result.content[0], "text", "")
+
+    async def call_tools(self, session: ClientSession, tool_calls: list[ChatCompletionMessageToolCall]) -> dict[str, str]:
+        """
+        Execute the tool calls of an assistant message.
+
+        Consecutive read-only calls run concurrently up to `max_concurrency`,
+        every mutating call runs alone and in order, so reads never overtake a preceding write.
+
+        Returns:
+            dict[str, str]: Tool results keyed by tool call id.
+        """
+        results: dict[str, str] = {}
+
+        async def call(tool_call: ChatCompletionMessageToolCall) -> None:
+            async with self.semaphore:
+                results[tool_call.id] = await self.call_tool(session, tool_call)
+
+        batch: list[ChatCompletionMessageToolCall] = []
+        for tool_call in tool_calls:
+            if tool_call.function.name in read_only_tools:
+                batch.append(tool_call)
+                continue
+            await asyncio.gather(*(call(tc) for tc in batch))
+            batch.clear()
+            results[tool_call.id] = await self.call_tool(session, tool_call)
+        await asyncio.gather(*(call(tc) for tc in batch))
+
+        return results
+
+    async def complete(self, available_tools: list[ChatCompletionToolParam], stats: QueryStats) -> tuple[str, list[ChatCompletionMessageToolCall]]:
+        """Stream a completion, printing content as it arrives, and return the content and tool calls."""
+        stream = await openai_client.chat.completions.create(
+            model=llm_config["model"] or "gpt-4o-mini",
+            messages=self.history.messages,  # type: ignore
+            tools=available_tools,
+            tool_choice="auto",
+            temperature=llm_config["temperature"],
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        stats.round_trips += 1
+
+        content: list[str] = []
+        # Tool calls arrive as fragments, keyed by their index in the message
+        tool_calls: dict[int, dict[str, str]] = {}
+        async for chunk in stream:
+            # Usage arrives in the last chunk, without choices
+            if chunk.usage:
+                stats.prompt_tokens += chunk.usage.prompt_tokens
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                if stats.ttft is None:
+                    stats.ttft = time.perf_counter() - stats.start
+                print(delta.content, end="", flush=True)
+                content.append(delta.content)
+            for fragment in delta.tool_calls or []:
+                tool_call = tool_calls.setdefault(
+                    fragment.index, {"id": "", "name": "", "arguments": ""})
+                tool_call["id"] += fragment.id or ""
+                if fragment.function:
+                    tool_call["name"] += fragment.function.name or ""
+                    tool_call["arguments"] += fragment.function.arguments or ""
+        if content:
+            print()
+
+        return "".join(content), [
+            ChatCompletionMessageToolCall(id=tool_call["id"], type="function", function=Function(
+                name=tool_call["name"], arguments=tool_call["arguments"]))
+            for _, tool_call in sorted(tool_calls.items())
         ]
 
     async def process_query(self, session: ClientSession, query: str) -> None:
+        stats = QueryStats()
+
         # Get available tools from MCP server
+        cached = self.tools is not None
         available_tools = await self.get_tools(session)
+        stats.tools = (time.perf_counter() - stats.start, cached)
 
-        self.messages.append(
+        stats.history = await self.history.compact()
+        self.history.append(
             {
                 "role": "user",
                 "content": query,
             }
         )
 
-        # Initial OpenAI API call
-        response = await openai_client.chat.completions.create(
-            model=llm_config["model"] or "gpt-4o-mini",
-            messages=self.messages,
-            tools=available_tools,
-            tool_choice="auto",
-            temperature=llm_config["temperature"],
-        )
-
-        # Process the response
-        assistant_message = response.choices[0].message
-        logger.debug(assistant_message)
-
-        if assistant_message.tool_calls:
-            self.messages.append(assistant_message)
-
-            # Process each tool call
-            for tool_call in assistant_message.tool_calls:
-                function_name = tool_call.function.name
-                logger.debug(f"Executing tool: {function_name}")
-
-                # Validate function arguments
-                try:
-                    function_args = json.loads(tool_call.function.arguments)
-                    logger.debug(
-                        f"Function arguments: {function_args}, type: {type(function_args)}")
-                    if not isinstance(function_args, dict):
-                        logger.error(
-                            f"Invalid function arguments format: expected dict, got {type(function_args).__name__}")
-                        function_args = {}
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to parse function arguments: {e}")
-                    function_args = {}
-
-                # Execute tool call
-                if function_name == "update_resource":
-                    logger.debug(
-                        f"Value of patch field: {function_args['patch']}")
-                    logger.debug(
-                        f"Type of patch fields: {type(function_args['patch'])}")
-                result = await session.call_tool(function_name, cast(dict[str, Any], function_args))
-                logger.debug(f"Tool result: {result}")
-                tool_result = getattr(result.content[0], "text", "")
+        # Keep running tool rounds until the model answers without calling tools
+        for _ in range(max_rounds):
+            content, tool_calls = await self.complete(available_tools, stats)
+            logger.debug(f"Assistant message: {content}, tool calls: {tool_calls}")
 
-                # Add the tool result to the conversation history
-                self.messages.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "content": tool_result,
+            if not tool_calls:
+                # If no tool calls, just add the response to the conversation history
+                self.history.append({
+                    "role": "assistant",
+                    "content": content
                 })
+                break
 
-            # Get the next response from OpenAI with the tool results
-            response = await openai_client.chat.completions.create(
-                model=llm_config["model"] or "gpt-4o-mini",
-                messages=self.messages,
-                tools=available_tools,
-                tool_choice="auto",
-                temperature=llm_config["temperature"],
-            )
-
-            # Process the final response
-            final_message = response.choices[0].message
-            self.messages.append({
+            self.history.append({
                 "role": "assistant",
-                "content": final_message.content
+                "content": content or None,
+                "tool_calls": [tool_call.model_dump() for tool_call in tool_calls],
             })
-            print(final_message.content or "")
 
+            # Process the tool calls, concurrently where it is safe to
+            results = await self.call_tools(session, tool_calls)
+            for tool_call in tool_calls:
+                # Add the tool result to the conversation history
+                self.history.append({
+                    "role": "tool",
+                    "tool_call_id": tool_call.id,
+                    "content": results[tool_call.id],
+                })
         else:
-            # If no tool calls, just add the response to the conversation history
-            self.messages.append({
-                "role": "assistant",
-                "content": assistant_message.content
-            })
+            print(f"Stopped after {max_rounds} rounds of tool calls.")
+
+        logger.info(stats)
 
     async def chat_loop(self, session: ClientSession):
         """Run the chat loop."""
         try:
             while True:
-                self.messages = [self.system_prompt]
                 query = input(
-                    "\nQuery (Type `exit`, `quit`, `q` to quit): ").strip()
+                    "\nQuery (Type `clear` to forget the conversation, `exit`, `quit`, `q` to quit): ").strip()
                 if query.lower() in ['exit', 'quit', 'q']:
                     print("\nGoodbye!")
                     break
+                if query.lower() == 'clear':
+                    self.history.clear()
+                    continue
                 await self.process_query(session, query)
-                # TODO: Simply clear the messages to isolate each query.
-                self.messages.clear()
         except KeyboardInterrupt:
             print("\nReceived keyboard interrupt. Exiting...")
         except Exception as e:
@@ -165,8 +307,9 @@ class Chat:
             print("Chat session ended.")
 
     async def run(self):
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
+        transport = sse_client(server_url) if server_url else stdio_client(server_params)
+        async with transport as (read, write):
+            async with ClientSession(read, write, message_handler=self.handle_message) as session:
                 # Initialize the connection
                 await session.initialize()
 
@@ -2,12 +2,25 @@ from mcp.server.fastmcp import FastMCP, Context
 from loguru import logger
 import mcp_server_factory
 from kubernetes.client.models import V1ParamKind  # type: ignore
-from langchain.chat_models.base import BaseChatModel, _ConfigurableModel
-from langchain_core.messages import SystemMessage, HumanMessage
-from typing import Union
+from typing import TYPE_CHECKING, Any, Callable, Union
+from dataclasses import replace
+from scheme.scheme import find_resource
+from utils.aggregation import Aggregation
+from utils.listing import iter_pages, match_selectors, reads_metadata_only
+from utils.manifests import apply_tiers, convert_stats, defined_kinds, is_established, parse_manifests
+from utils.history import CHARS_PER_TOKEN
+from utils.metrics import current_span
+from utils.models import CachedChatModel, LazyChatModel
+from utils.pruning import Pruner, dump_yaml, select_paths
+from utils.tables import Table, create_table
 from config.config import config
 import sys
 import json
+import time
+import anyio
+
+if TYPE_CHECKING:
+    from langchain.chat_models.base import BaseChatModel, _ConfigurableModel
 
 
 logger.configure(
@@ -17,6 +30,19 @@ mcp = mcp_server_factory.create_mcp_server()
 
 llm_config = config["server"]["llm"]
 
+# Objects patched or deleted concurrently between progress reports of bulk tools
+bulk_batch_size = config["mcp"].get("bulk_batch_size", 50)
+# Seconds apply_resources waits for CustomResourceDefinitions to be served before their custom resources
+crd_established_timeout = config["mcp"].get("crd_established_timeout", 30)
+
+# Field manager owning the fields set by server-side apply
+field_manager = config["mcp"].get("field_manager", "kopilot")
+
+# Estimated tokens of the result of a tool, rows of a table or characters of an object beyond it are left out
+output_token_budget = config["mcp"].get("output_token_budget", 4000)
+# Longer values of objects in detail are truncated
+detail_max_value_bytes = config["mcp"].get("detail_max_value_bytes", 1024)
+
 create_prompt: str = """You are a Kubernetes expert.
 Your job is to transform Kubernetes resource manifest from user input in YAML to one-line JSON.
 You may refer to Kubernetes API doccuments: https://kubernetes.io/docs/reference/kubernetes-api/ for more information.
@@ -49,22 +75,29 @@ DO NOT include the generated manifest into the code block."""
 #     return len(lc.scheme.keys())
 
 
-def __send_message(llm: Union[BaseChatModel, _ConfigurableModel], prompt: str, input: str) -> Union[str, list[Union[str, dict]]]:
+async def __send_message(llm: Union["BaseChatModel", "_ConfigurableModel", CachedChatModel, LazyChatModel], prompt: str, input: str,
+                         validate: Callable[[Any], Any] | None = None) -> Union[str, list[Union[str, dict]]]:
     """
     Send a message to the LLM.
 
     Args:
         llm (Context): The LLM context.
         input (str): The original user input message.
+        validate (Callable): Raises if the response is unusable, so that the LLM cache never keeps it.
 
     Returns:
         str: The response from the LLM.
     """
+    from langchain_core.messages import SystemMessage, HumanMessage
+
     messages = [
         SystemMessage(content=prompt),
         HumanMessage(content=input),
     ]
-    response = llm.invoke(
+    # Plain LangChain models would pass `validate` on to the provider
+    kwargs = {"validate": validate} if validate and isinstance(llm, (CachedChatModel, LazyChatModel)) else {}
+    start = time.perf_counter()
+    response = await llm.ainvoke(
         messages,
         config={
             "configurable": {
@@ -73,13 +106,32 @@ def __send_message(llm: Union[BaseChatModel, _ConfigurableModel], prompt: str, i
                 "api_key": llm_config["api_key"],
                 "model": llm_config["model"],
             }
-        }
+        },
+        **kwargs,
     )
+    if span := current_span():
+        span.add("llm", time.perf_counter() - start)
     return response.content
 
 
+async def _cluster(ctx: Context, context: str) -> mcp_server_factory.MCPContext:
+    """
+    Lifespan context with the scheme, client, cache and limiter of the cluster of a kubeconfig context.
+
+    Raises:
+        ValueError: If the cluster of the context cannot be used.
+    """
+    lc = ctx.request_context.lifespan_context
+    if not lc or not context or context == lc.context:
+        return lc
+    if not lc.pool:
+        raise ValueError("Only the current context is supported.")
+    cluster = await lc.pool.get(context)
+    return replace(lc, scheme=cluster.scheme, client=cluster.client, cache=cluster.cache, limiter=cluster.limiter)
+
+
 @mcp.tool()
-def create_resource(ctx: Context, resource: str, manifest_yaml: str, namespace: str = "") -> str:
+async def create_resource(ctx: Context, resource: str, manifest_yaml: str, namespace: str = "", context: str = "") -> str:
     """
     Create a resource in a namespace.
 
@@ -88,49 +140,91 @@ def create_resource(ctx: Context, resource: str, manifest_yaml: str, namespace:
         resource (str): The kubernetes resource to create.
         manifest_yaml (str): The kubernetes resource manifest in yaml.
         namespace (str): The kubernetes namespace where the resource is.
+        context (str): The kubeconfig context of the cluster, the current context if empty.
 
     Returns:
         str: The result of the creation.
     """
-    if not (lc := ctx.request_context.lifespan_context) or not (client := lc.client) or not (scheme := lc.scheme) or not (llm := lc.llm):
+    try:
+        lc = await _cluster(ctx, context)
+    except ValueError as e:
+        return str(e)
+
+    if not lc or not (client := lc.client) or not (scheme := lc.scheme) or not (llm := lc.llm):
         return "Context is missing."
 
     if not resource:
         return "Resource is null."
 
-    if not resource in scheme.keys():
+    if not (resource := scheme.resolve(resource)):
         return "Invalid resource. Please run `kubectl api-resources` to get supported API resources on the server."
 
     logger.debug(
         f"Create the [{resource}] in namespace [{namespace}] with manifest:\n{manifest_yaml}")
 
-    manifest_json_str = __send_message(
-        llm, prompt=create_prompt, input=manifest_yaml)
-    logger.debug(f"Manifest:\n{manifest_json_str}")
+    gvk = scheme[resource].gvk
+    start = time.perf_counter()
 
-    # Validate and parse JSON manifest
+    # Well-formed manifests only need a YAML parser, the LLM is left for malformed or natural language ones
     try:
-        # Parse the JSON string into a Python dictionary
-        manifest_json = json.loads(manifest_json_str) if isinstance(
-            manifest_json_str, str) else manifest_json_str
-    except json.JSONDecodeError as e:
-        logger.error(f"Invalid JSON manifest: {e}")
-        sys.exit(1)
-
-    api = client.resources.get(
-        api_version=scheme[resource].gvk.api_version,
-        kind=scheme[resource].gvk.kind,
-    )
+        manifests = parse_manifests(
+            manifest_yaml, api_version=gvk.api_version, kind=gvk.kind)
+        convert_path = "local"
+    except ValueError as e:
+        logger.debug(f"Fall back to LLM to convert manifest: {e}")
+
+        def parse(content: Any) -> Any:
+            # Parse the JSON string into a Python dictionary
+            return json.loads(content) if isinstance(content, str) else content
+
+        # Validate and parse JSON manifest, the LLM cache only keeps responses which parse
+        try:
+            manifest_json_str = await __send_message(
+                llm, prompt=create_prompt, input=manifest_yaml, validate=parse)
+            logger.debug(f"Manifest:\n{manifest_json_str}")
+            manifest_json = parse(manifest_json_str)
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid JSON manifest: {e}")
+            return f"Invalid JSON manifest: {e}"
+        manifests = manifest_json if isinstance(
+            manifest_json, list) else [manifest_json]
+        convert_path = "llm"
+
+    convert_stats[convert_path].observe(time.perf_counter() - start)
+    logger.debug(
+        f"Converted manifest via [{convert_path}], " + ", ".join(f"{path}: {stats}" for path, stats in convert_stats.items()))
 
-    try:
-        response = api.create(body=manifest_json, namespace=namespace)
-    except Exception as e:
-        logger.error(f"Error creating resource: {e}")
-        sys.exit(1)
+    def create() -> str:
+        api = scheme.handle(client, resource)
+        watch_cache = lc.cache.watch(resource, api) if lc.cache else None
+
+        names = []
+        for manifest in manifests:
+            # Documents of another type in a multi-document manifest resolve to their own API
+            same_type = (manifest.get("apiVersion", gvk.api_version), manifest.get("kind", gvk.kind)) == (
+                gvk.api_version, gvk.kind)
+            target = api if same_type else client.resources.get(
+                api_version=manifest["apiVersion"], kind=manifest["kind"])
+
+            try:
+                response = target.create(body=manifest, namespace=namespace)
+            except Exception as e:
+                logger.error(f"Error creating resource: {e}")
+                # Documents created before the failing one stay, so say which they are
+                created = f" after creating [{', '.join(names)}]" if names else ""
+                return f"Error creating [{resource}]{created}: {e.summary() if hasattr(e, 'summary') else e}"
+
+            logger.debug(f"Created response: {response}")
+
+            if same_type and watch_cache:
+                watch_cache.upsert(response.to_dict())
+            names.append(f"{response.kind}/{response.metadata.name}")
 
-    logger.debug(f"Created response: {response}")
+        if len(names) == 1:
+            return f"Create [{resource}] in namespace [{namespace}] successfully."
+        return f"Create [{', '.join(names)}] in namespace [{namespace}] successfully."
 
-    return f"Create [{resource}] in namespace [{namespace}] successfully."
+    return await anyio.to_thread.run_sync(create, limiter=lc.limiter)
 
 
 # TODO: Error if str type hint on patch parameter, else if dict type hint on patch parameter, then function will not be called
@@ -138,7 +232,7 @@ def create_resource(ctx: Context, resource: str, manifest_yaml: str, namespace:
 # patch
 # Input should be a valid string [type=string_type, input_value={'metadata': {'labels': {'app': 'busybox'}}}, input_type=dict]    For further information visit https://errors.pydantic.dev/2.8/v/string_type", annotations=None)] isError=True
 @mcp.tool()
-def update_resource(ctx: Context, resource: str, name: str, patch, namespace: str = "") -> str:
+async def update_resource(ctx: Context, resource: str, name: str, patch, namespace: str = "", context: str = "") -> str:
     """
     Update a resource in a namespace.
 
@@ -148,55 +242,59 @@ def update_resource(ctx: Context, resource: str, name: str, patch, namespace: st
         name (str): The name of the resource to update.
         patch: The patch to apply to the resource.
         namespace (str): The kubernetes namespace where the resource is.
+        context (str): The kubeconfig context of the cluster, the current context if empty.
 
     Returns:
         str: The result of the update.
     """
-    if not (lc := ctx.request_context.lifespan_context) or not (client := lc.client) or not (scheme := lc.scheme) or not (llm := lc.llm):
+    try:
+        lc = await _cluster(ctx, context)
+    except ValueError as e:
+        return str(e)
+
+    if not lc or not (client := lc.client) or not (scheme := lc.scheme) or not (llm := lc.llm):
         return "Context is missing."
 
     if not resource:
         return "Resource is null."
 
-    if not resource in scheme.keys():
+    if not (resource := scheme.resolve(resource)):
         return "Invalid resource. Please run `kubectl api-resources` to get supported API resources on the server."
 
     logger.debug(
         f"Update the [{resource}] named [{name}] in namespace [{namespace}] given patch:\n{patch}")
 
-    api = client.resources.get(
-        api_version=scheme[resource].gvk.api_version,
-        kind=scheme[resource].gvk.kind,
-    )
+    def update() -> str:
+        api = scheme.handle(client, resource)
 
-    # Get the resource by name
-    try:
-        if scheme[resource].is_namespaced:
-            _ = api.get(namespace=namespace, name=name)
-        else:
-            _ = api.get(name=name)
-    except Exception as e:
-        logger.error(f"Error getting resource: {e}")
-        sys.exit(1)
+        # No need to get the resource first, the patch fails if it does not exist,
+        # and a metadata.resourceVersion in the patch makes the server reject it if the resource changed meanwhile
+        try:
+            if scheme[resource].is_namespaced:
+                response = api.patch(name=name, body=patch,
+                                     content_type="application/merge-patch+json",
+                                     namespace=namespace)
+            else:
+                response = api.patch(name=name, body=patch,
+                                     content_type="application/merge-patch+json")
+        except Exception as e:
+            logger.error(f"Error patching resource: {e}")
+            # e.g. a 409 Conflict when the patch carries a stale metadata.resourceVersion
+            return f"Error patching [{resource}] [{name}]: {e.summary() if hasattr(e, 'summary') else e}"
 
-    try:
-        if scheme[resource].is_namespaced:
-            response = api.patch(name=name, body=patch,
-                                 content_type="application/merge-patch+json",
-                                 namespace=namespace)
-        else:
-            response = api.patch(name=name, body=patch,
-                                 content_type="application/merge-patch+json")
-    except Exception as e:
-        logger.error(f"Error patching resource: {e}")
+        logger.debug(f"Updated response: {response}")
 
-    logger.debug(f"Updated response: {response}")
+        if lc.cache and (watch_cache := lc.cache.watch(resource, api)):
+            watch_cache.upsert(response.to_dict())
 
-    return f"Update [{resource}] in namespace [{namespace}] successfully."
+        return f"Update [{resource}] in namespace [{namespace}] successfully."
+
+    return await anyio.to_thread.run_sync(update, limiter=lc.limiter)
 
 
 @mcp.tool()
-def get_resources(ctx: Context, resource: str, namespace: str = "") -> str:
+async def get_resources(ctx: Context, resource: str, namespace: str = "", label_selector: str = "", field_selector: str = "",
+                        columns: str = "", limit: int = 500, continue_token: str = "", max_items: int = 1000, context: str = "") -> str:
     """
     Get a list of resources in a namespace.
 
@@ -204,47 +302,185 @@ def get_resources(ctx: Context, resource: str, namespace: str = "") -> str:
         ctx (Context): MCP server context.
         resource (str): The kubernetes resource to get.
         namespace (str): The kubernetes namespace where the resource is.
+        label_selector (str): Filter resources by labels, e.g. `app=nginx,tier in (web,api)`.
+        field_selector (str): Filter resources by fields, e.g. `status.phase!=Running`.
+        columns (str): Comma separated columns replacing the default kubectl-like ones, either field paths (e.g. `status.phase`) or one of namespace, phase, status, node, ip, replicas, restarts.
+        limit (int): The number of resources fetched per page from the API server.
+        continue_token (str): The token returned by a previous call to get the next resources.
+        max_items (int): The maximum number of resources to return in this call.
+        context (str): The kubeconfig context of the cluster, the current context if empty.
 
     Returns:
         str: The list of resources in namespace.
     """
-    if not (lc := ctx.request_context.lifespan_context) or not (client := lc.client) or not (scheme := lc.scheme):
+    try:
+        lc = await _cluster(ctx, context)
+    except ValueError as e:
+        return str(e)
+
+    if not lc or not (client := lc.client) or not (scheme := lc.scheme):
         return "Context is missing."
 
     if not resource:
         return "Resource is null."
 
-    if not resource in scheme.keys():
+    if not (resource := scheme.resolve(resource)):
         return "Invalid resource. Please run `kubectl api-resources` to get supported API resources on the server."
 
-    logger.debug(f"Get the list of [{resource}] in namespace [{namespace}]")
-
-    api = client.resources.get(
-        api_version=scheme[resource].gvk.api_version,
-        kind=scheme[resource].gvk.kind,
-    )
+    entry = scheme[resource]
+    try:
+        table = create_table(entry.gvk.kind, columns, all_namespaces=entry.is_namespaced and not namespace,
+                             budget=output_token_budget)
+        # Fail fast on malformed selectors, before any API call
+        list(match_selectors([], label_selector, field_selector))
+    except ValueError as e:
+        return str(e)
 
+    logger.debug(
+        f"Get the list of [{resource}] in namespace [{namespace}] selected by [{label_selector}] [{field_selector}]")
+
+    def resolve():
+        api = scheme.handle(client, resource)
+        # A continue token is only meaningful to the API server
+        watch_cache = lc.cache.watch(
+            resource, api) if lc.cache and not continue_token else None
+        if watch_cache and (cached := watch_cache.list(namespace if entry.is_namespaced else "")) is not None:
+            return api, list(match_selectors(cached, label_selector, field_selector))
+        return api, None
+
+    api, items = await anyio.to_thread.run_sync(resolve, limiter=lc.limiter)
+
+    if items is not None and (not max_items or len(items) <= max_items):
+        logger.debug(f"Serve the list of [{resource}] from watch cache")
+        for res in items:
+            table.add(res)
+        return _render_table(resource, table)
+
+    # Selectors are pushed down to the API server, and if the columns only read metadata,
+    # skip specs and status on the wire
+    pages = iter_pages(api, entry.is_namespaced, namespace, metadata_only=table.metadata_only,
+                       limit=limit, continue_token=continue_token, max_items=max_items,
+                       label_selector=label_selector, field_selector=field_selector)
+    # Token of the page being fetched, so that a page cut by the budget can be fetched again
+    count, next_token, cut = 0, continue_token, ""
     try:
-        if scheme[resource].is_namespaced:
-            resources = api.get(namespace=namespace)
-        else:
-            resources = api.get()
+        # Fetch page by page, so that neither the whole list nor a long blocking call is ever held
+        while page := await anyio.to_thread.run_sync(next, pages, None, limiter=lc.limiter):
+            rows = table.rows
+            # Project each object straight into its output line, the page is dropped afterwards
+            for res in page.items:
+                table.add(res)
+            count += len(page.items)
+            await ctx.report_progress(count, count + page.remaining if page.remaining is not None else None)
+            # Stop at the page boundary, so that the continue token resumes at the first row not shown
+            if table.omitted and rows:
+                table.truncate(rows)
+                cut = (f"{len(page.items) + page.remaining}" if page.remaining is not None
+                       else f"At least {len(page.items)}")
+                break
+            next_token = page.continue_token
+            # Only when the first page alone exceeds the budget, its rows not shown cannot be resumed
+            if table.omitted:
+                break
     except Exception as e:
         logger.error(f"Error getting resource: {e}")
-        sys.exit(1)
+        return f"Error getting [{resource}]: {e.summary() if hasattr(e, 'summary') else e}"
 
-    # TODO: Simply return the name list of resources
-    # Perhaps subprocess kubectl directly would get better output instead of formatting output right here,
-    output = [f"{'NAME'}"]
-    for res in resources.items:
-        name = res.metadata.name
-        output.append(f"{name}")
+    output = _render_table(resource, table, "lower the limit or narrow down with label_selector or field_selector")
+    if cut:
+        output += (f"\n\n{cut} more [{resource}] not shown to stay within the output budget, call again with "
+                   f"continue_token=\"{next_token}\" to get them, or narrow down with label_selector or field_selector.")
+    elif next_token:
+        output += f"\n\nThere are more [{resource}], call again with continue_token=\"{next_token}\" to get them."
+    return output
 
-    return '\n'.join(output)
+
+def _render_table(resource: str, table: Table, hint: str = "narrow down with label_selector or field_selector") -> str:
+    """Render a table, noting rows left out to stay within the output budget."""
+    output = table.render()
+    logger.debug(f"Rendered {table.rows} [{resource}] in ~{table.tokens} tokens")
+    if table.omitted:
+        output += f"\n\n{table.omitted} more [{resource}] not shown to stay within the output budget, {hint}."
+    return output
 
 
 @mcp.tool()
-def get_resource(ctx: Context, resource: str, name: str, namespace: str = "") -> str:
+async def aggregate_resources(ctx: Context, resource: str, aggregate: str = "count", field: str = "", group_by: str = "",
+                              namespace: str = "", label_selector: str = "", field_selector: str = "", context: str = "") -> str:
+    """
+    Count resources, or sum, min or max one of their fields, grouped by other fields, without listing them.
+
+    Args:
+        ctx (Context): MCP server context.
+        resource (str): The kubernetes resource to aggregate.
+        aggregate (str): One of count, sum, min, max.
+        field (str): The field to sum, min or max, or to count the resources having it, either a field path (e.g. `spec.replicas`) or one of replicas, restarts.
+        group_by (str): Comma separated fields to group by, either field paths (e.g. `spec.nodeName`) or one of namespace, phase, status, node, ip.
+        namespace (str): The kubernetes namespace where the resources are, all namespaces if empty.
+        label_selector (str): Filter resources by labels, e.g. `app=nginx,tier in (web,api)`.
+        field_selector (str): Filter resources by fields, e.g. `status.phase!=Running`.
+        context (str): The kubeconfig context of the cluster, the current context if empty.
+
+    Returns:
+        str: The value of each group.
+    """
+    try:
+        lc = await _cluster(ctx, context)
+    except ValueError as e:
+        return str(e)
+
+    if not lc or not (client := lc.client) or not (scheme := lc.scheme):
+        return "Context is missing."
+
+    if not resource:
+        return "Resource is null."
+
+    if not (resource := scheme.resolve(resource)):
+        return "Invalid resource. Please run `kubectl api-resources` to get supported API resources on the server."
+
+    try:
+        aggregation = Aggregation(aggregate, field, group_by)
+        # Fail fast on malformed selectors, before any API call
+        list(match_selectors([], label_selector, field_selector))
+    except ValueError as e:
+        return str(e)
+
+    logger.debug(
+        f"Aggregate [{aggregate}] of [{field}] over [{resource}] in namespace [{namespace}] grouped by [{group_by}]")
+
+    def resolve():
+        api = scheme.handle(client, resource)
+        watch_cache = lc.cache.watch(resource, api) if lc.cache else None
+        if watch_cache and (cached := watch_cache.list(namespace if scheme[resource].is_namespaced else "")) is not None:
+            logger.debug(f"Aggregate [{resource}] from watch cache")
+            for res in match_selectors(cached, label_selector, field_selector):
+                aggregation.add(res)
+            return api, True
+        return api, False
+
+    api, cached = await anyio.to_thread.run_sync(resolve, limiter=lc.limiter)
+    if cached:
+        return aggregation.render(output_token_budget)
+
+    # Fold page by page, so that only the groups are ever held, never the list
+    pages = iter_pages(api, scheme[resource].is_namespaced, namespace,
+                       metadata_only=reads_metadata_only(f"{field},{group_by}"), limit=500,
+                       label_selector=label_selector, field_selector=field_selector)
+    try:
+        while page := await anyio.to_thread.run_sync(next, pages, None, limiter=lc.limiter):
+            for res in page.items:
+                aggregation.add(res)
+            await ctx.report_progress(aggregation.count, aggregation.count + page.remaining if page.remaining is not None else None)
+    except Exception as e:
+        logger.error(f"Error aggregating resource: {e}")
+        return f"Error aggregating [{resource}]: {e}"
+
+    return aggregation.render(output_token_budget)
+
+
+@mcp.tool()
+async def get_resource(ctx: Context, resource: str, name: str, namespace: str = "", detail: bool = False,
+                       paths: str = "", context: str = "") -> str:
     """
     Get a resource in a namespace by name.
 
@@ -253,47 +489,80 @@ def get_resource(ctx: Context, resource: str, name: str, namespace: str = "") ->
         resource (str): The kubernetes resource to get.
         name (str): The name of the resource to get.
         namespace (str): The kubernetes namespace where the resource is.
+        detail (bool): Return the object as YAML, without managed fields and with large values truncated, instead of a summary row.
+        paths (str): Comma separated JSONPaths of the subtrees to return in detail, e.g. `.spec.containers[*].image,.status.conditions`.
+        context (str): The kubeconfig context of the cluster, the current context if empty.
 
     Returns:
         str: The resource in namespace.
     """
-    if not (lc := ctx.request_context.lifespan_context) or not (client := lc.client) or not (scheme := lc.scheme):
+    try:
+        lc = await _cluster(ctx, context)
+    except ValueError as e:
+        return str(e)
+
+    if not lc or not (client := lc.client) or not (scheme := lc.scheme):
         return "Context is missing."
 
     if not resource:
         return "Resource is null."
 
-    if not resource in scheme.keys():
+    if not (resource := scheme.resolve(resource)):
         return "Invalid resource. Please run `kubectl api-resources` to get supported API resources on the server."
 
     if not name:
         return "Name is null."
 
+    try:
+        # Fail fast on malformed paths, before any API call
+        select_paths({}, paths)
+    except ValueError as e:
+        return str(e)
+    detail = detail or bool(paths)
+
     logger.debug(
         f"Get the [{resource}] named [{name}] in namespace [{namespace}]")
 
-    api = client.resources.get(
-        api_version=scheme[resource].gvk.api_version,
-        kind=scheme[resource].gvk.kind,
-    )
+    def get() -> str:
+        api = scheme.handle(client, resource)
+        pruner = Pruner(detail_max_value_bytes)
 
-    try:
-        if scheme[resource].is_namespaced:
-            resource = api.get(namespace=namespace, name=name)
+        watch_cache = lc.cache.watch(resource, api) if lc.cache else None
+        if watch_cache and (obj := watch_cache.get(name, namespace if scheme[resource].is_namespaced else "")):
+            logger.debug(f"Serve the [{resource}] named [{name}] from watch cache")
+            if detail:
+                obj = pruner.prune(obj)
         else:
-            resource = api.get(name=name)
-    except Exception as e:
-        logger.error(f"Error getting resource: {e}")
-        sys.exit(1)
-
-    output = [f"{'NAME'}"]
-    output.append(f"{resource.metadata.name}")
-
-    return '\n'.join(output)
+            try:
+                if scheme[resource].is_namespaced:
+                    response = api.get(namespace=namespace, name=name, serialize=False)
+                else:
+                    response = api.get(name=name, serialize=False)
+            except Exception as e:
+                logger.error(f"Error getting resource: {e}")
+                return f"Error getting [{resource}] [{name}]: {e.summary() if hasattr(e, 'summary') else e}"
+            # Pruned while decoding, the noise is never materialized
+            obj = pruner.loads(response.data) if detail else json.loads(response.data)
+
+        if not detail:
+            table = create_table(scheme[resource].gvk.kind)
+            table.add(obj)
+            return table.render()
+
+        output = dump_yaml(select_paths(obj, paths) if paths else obj)
+        if pruner.pruned_bytes:
+            output += f"# {pruner.pruned_bytes} bytes of managed fields, last applied configuration and large values left out\n"
+        budget = output_token_budget * CHARS_PER_TOKEN
+        if len(output) > budget:
+            output = (f"{output[:budget]}\n... {len(output) - budget} more characters left out to stay within "
+                      f"the output budget, select subtrees with paths.")
+        return output
+
+    return await anyio.to_thread.run_sync(get, limiter=lc.limiter)
 
 
 @mcp.tool()
-def delete_resource(ctx: Context, resource: str, name: str, namespace: str = "") -> str:
+async def delete_resource(ctx: Context, resource: str, name: str, namespace: str = "", context: str = "") -> str:
     """
     Delete a resource in a namespace.
 
@@ -302,17 +571,23 @@ def delete_resource(ctx: Context, resource: str, name: str, namespace: str = "")
         resource (str): The kubernetes resource to delete.
         namespace (str): The kubernetes namespace where the resource is.
         name (str): The name of the resource to delete.
+        context (str): The kubeconfig context of the cluster, the current context if empty.
 
     Returns:
         str: The result of the deletion.
     """
-    if not (lc := ctx.request_context.lifespan_context) or not (client := lc.client) or not (scheme := lc.scheme):
+    try:
+        lc = await _cluster(ctx, context)
+    except ValueError as e:
+        return str(e)
+
+    if not lc or not (client := lc.client) or not (scheme := lc.scheme):
         return "Context is missing."
 
     if not resource:
         return "Resource is null."
 
-    if not resource in scheme.keys():
+    if not (resource := scheme.resolve(resource)):
         return "Invalid resource. Please run `kubectl api-resources` to get supported API resources on the server."
 
     if not name:
@@ -321,22 +596,325 @@ def delete_resource(ctx: Context, resource: str, name: str, namespace: str = "")
     logger.debug(
         f"Delete the [{resource}] [{name}] in namespace [{namespace}]")
 
-    api = client.resources.get(
-        api_version=scheme[resource].gvk.api_version,
-        kind=scheme[resource].gvk.kind,
-    )
+    def delete() -> str:
+        api = scheme.handle(client, resource)
+
+        try:
+            if scheme[resource].is_namespaced:
+                api.delete(namespace=namespace, name=name)
+            else:
+                api.delete(name=name)
+        except Exception as e:
+            logger.error(f"Error deleting resource: {e}")
+            return f"Error deleting [{resource}] [{name}]: {e.summary() if hasattr(e, 'summary') else e}"
 
+        if lc.cache and (watch_cache := lc.cache.watch(resource, api)):
+            watch_cache.remove(name, namespace if scheme[resource].is_namespaced else "")
+
+        return f"Delete [{resource}] [{name}] in namespace [{namespace}] successfully."
+
+    return await anyio.to_thread.run_sync(delete, limiter=lc.limiter)
+
+
+async def _select(lc: mcp_server_factory.MCPContext, resource: str, namespace: str, label_selector: str, field_selector: str) -> tuple[Any, list[tuple[str, str, str]]]:
+    """Resolve a resource and list (namespace, name, resourceVersion) of the objects matching the selectors."""
+    entry = lc.scheme[resource]
+
+    def select():
+        api = lc.scheme.handle(lc.client, resource)
+        selected = [
+            (obj["metadata"].get("namespace", ""), obj["metadata"]["name"], obj["metadata"].get("resourceVersion", ""))
+            for page in iter_pages(api, entry.is_namespaced, namespace, metadata_only=True,
+                                   label_selector=label_selector, field_selector=field_selector)
+            for obj in page.items
+        ]
+        return api, selected
+
+    return await anyio.to_thread.run_sync(select, limiter=lc.limiter)
+
+
+async def _in_batches(ctx: Context, lc: mcp_server_factory.MCPContext, func: Callable[..., str], targets: list[tuple[str, str, str]]) -> list[str]:
+    """Run a blocking call per target concurrently under the cluster limiter, reporting progress per batch."""
+    results: list[str] = [""] * len(targets)
+
+    async def run(i: int) -> None:
+        results[i] = await anyio.to_thread.run_sync(func, *targets[i], limiter=lc.limiter)
+
+    for start in range(0, len(targets), bulk_batch_size):
+        async with anyio.create_task_group() as tg:
+            for i in range(start, min(start + bulk_batch_size, len(targets))):
+                tg.start_soon(run, i)
+        await ctx.report_progress(min(start + bulk_batch_size, len(targets)), len(targets))
+    return results
+
+
+def _summarize(resource: str, targets: list[tuple[str, str, str]], results: list[str]) -> str:
+    output = [f"{sum(result == 'ok' for result in results)}/{len(targets)} [{resource}] succeeded."]
+    # Only failures are listed, one line each
+    for (namespace, name, _), result in zip(targets, results):
+        if result != "ok":
+            output.append(f"{namespace}/{name}\t{result}" if namespace else f"{name}\t{result}")
+    return '\n'.join(output)
+
+
+@mcp.tool()
+async def patch_resources(ctx: Context, resource: str, patch, namespace: str = "", label_selector: str = "", field_selector: str = "", context: str = "") -> str:
+    """
+    Update all resources matching selectors in a namespace with the same merge patch.
+
+    Args:
+        ctx (Context): MCP server context.
+        resource (str): The kubernetes resource to update.
+        patch: The merge patch to apply to each resource.
+        namespace (str): The kubernetes namespace where the resources are, all namespaces if empty.
+        label_selector (str): Select resources by labels, e.g. `app=nginx`.
+        field_selector (str): Select resources by fields, e.g. `status.phase=Succeeded`.
+        context (str): The kubeconfig context of the cluster, the current context if empty.
+
+    Returns:
+        str: The number of updated resources and the failures.
+    """
     try:
-        if scheme[resource].is_namespaced:
-            api.delete(namespace=namespace, name=name)
-        else:
-            api.delete(name=name)
-    except Exception as e:
-        logger.error(f"Error deleting resource: {e}")
-        sys.exit(1)
+        lc = await _cluster(ctx, context)
+    except ValueError as e:
+        return str(e)
+
+    if not lc or not lc.client or not (scheme := lc.scheme):
+        return "Context is missing."
+
+    if not resource:
+        return "Resource is null."
+
+    if not (resource := scheme.resolve(resource)):
+        return "Invalid resource. Please run `kubectl api-resources` to get supported API resources on the server."
+
+    if not label_selector and not field_selector:
+        return "Selector is null. Use update_resource to update a single resource by name."
+
+    if isinstance(patch, str):
+        try:
+            patch = json.loads(patch)
+        except json.JSONDecodeError as e:
+            return f"Invalid patch: {e}"
+    if not isinstance(patch, dict):
+        return "Invalid patch: expected a JSON object."
+
+    logger.debug(
+        f"Patch [{resource}] in namespace [{namespace}] selected by [{label_selector}] [{field_selector}] given patch:\n{patch}")
+
+    api, targets = await _select(lc, resource, namespace, label_selector, field_selector)
+    watch_cache = lc.cache.watch(resource, api) if lc.cache else None
+
+    def patch_one(target_namespace: str, name: str, resource_version: str) -> str:
+        # The resourceVersion seen when listing makes the server reject the patch with a conflict
+        # if the object changed since, instead of reading each object before patching it
+        body = {**patch, "metadata": {**patch.get("metadata", {}), "resourceVersion": resource_version}}
+        try:
+            response = api.patch(name=name, body=body, content_type="application/merge-patch+json",
+                                 namespace=target_namespace or None)
+        except Exception as e:
+            logger.error(f"Error patching resource {name}: {e}")
+            return f"error: {e.summary() if hasattr(e, 'summary') else e}"
+        if watch_cache:
+            watch_cache.upsert(response.to_dict())
+        return "ok"
+
+    return _summarize(resource, targets, await _in_batches(ctx, lc, patch_one, targets))
 
-    return f"Delete [{resource}] [{name}] in namespace [{namespace}] successfully."
+
+@mcp.tool()
+async def delete_resources(ctx: Context, resource: str, namespace: str = "", label_selector: str = "", field_selector: str = "", context: str = "") -> str:
+    """
+    Delete all resources matching selectors in a namespace.
+
+    Args:
+        ctx (Context): MCP server context.
+        resource (str): The kubernetes resource to delete.
+        namespace (str): The kubernetes namespace where the resources are, all namespaces if empty.
+        label_selector (str): Select resources by labels, e.g. `app=nginx`.
+        field_selector (str): Select resources by fields, e.g. `status.phase=Succeeded`.
+        context (str): The kubeconfig context of the cluster, the current context if empty.
+
+    Returns:
+        str: The number of deleted resources and the failures.
+    """
+    try:
+        lc = await _cluster(ctx, context)
+    except ValueError as e:
+        return str(e)
+
+    if not lc or not (client := lc.client) or not (scheme := lc.scheme):
+        return "Context is missing."
+
+    if not resource:
+        return "Resource is null."
+
+    if not (resource := scheme.resolve(resource)):
+        return "Invalid resource. Please run `kubectl api-resources` to get supported API resources on the server."
+
+    if not label_selector and not field_selector:
+        return "Selector is null. Use delete_resource to delete a single resource by name."
+
+    logger.debug(
+        f"Delete [{resource}] in namespace [{namespace}] selected by [{label_selector}] [{field_selector}]")
+
+    entry = scheme[resource]
+    # DeleteCollection removes every match in one request, but only within a namespace for namespaced resources
+    if "deletecollection" in entry.verbs and (namespace or not entry.is_namespaced):
+        def delete_collection() -> str:
+            api = scheme.handle(client, resource)
+            try:
+                response = api.delete(namespace=namespace or None, label_selector=label_selector or None,
+                                      field_selector=field_selector or None, serialize=False)
+            except Exception as e:
+                logger.error(f"Error deleting resources: {e}")
+                return f"Error deleting [{resource}]: {e.summary() if hasattr(e, 'summary') else e}"
+            deleted = json.loads(response.data).get("items", [])
+            if lc.cache and (watch_cache := lc.cache.watch(resource, api)):
+                for obj in deleted:
+                    watch_cache.remove(obj["metadata"]["name"], obj["metadata"].get("namespace", ""))
+            return f"{len(deleted)} [{resource}] deleted."
+
+        return await anyio.to_thread.run_sync(delete_collection, limiter=lc.limiter)
+
+    api, targets = await _select(lc, resource, namespace, label_selector, field_selector)
+    watch_cache = lc.cache.watch(resource, api) if lc.cache else None
+
+    def delete_one(target_namespace: str, name: str, resource_version: str) -> str:
+        try:
+            # Precondition on the listed resourceVersion, so an object changed since is not deleted blindly
+            api.delete(name=name, namespace=target_namespace or None,
+                       body={"preconditions": {"resourceVersion": resource_version}})
+        except Exception as e:
+            logger.error(f"Error deleting resource {name}: {e}")
+            return f"error: {e.summary() if hasattr(e, 'summary') else e}"
+        if watch_cache:
+            watch_cache.remove(name, target_namespace)
+        return "ok"
+
+    return _summarize(resource, targets, await _in_batches(ctx, lc, delete_one, targets))
+
+
+@mcp.tool()
+async def apply_resources(ctx: Context, manifests: str, namespace: str = "", dry_run: bool = False, force_conflicts: bool = False, context: str = "") -> str:
+    """
+    Apply many resources at once with server-side apply.
+
+    Args:
+        ctx (Context): MCP server context.
+        manifests (str): The kubernetes resource manifests, in multi-document yaml or a json list of objects.
+        namespace (str): The kubernetes namespace of namespaced resources without one in their manifest.
+        dry_run (bool): Validate the manifests on the server without persisting them, custom resources of CRDs among the manifests are skipped.
+        force_conflicts (bool): Take ownership of fields managed by other field managers.
+        context (str): The kubeconfig context of the cluster, the current context if empty.
+
+    Returns:
+        str: The result of each resource.
+    """
+    try:
+        lc = await _cluster(ctx, context)
+    except ValueError as e:
+        return str(e)
+
+    if not lc or not (client := lc.client) or not (scheme := lc.scheme):
+        return "Context is missing."
+
+    try:
+        objects = parse_manifests(manifests)
+    except ValueError as e:
+        return f"Invalid manifests: {e}"
+
+    logger.debug(
+        f"Apply {len(objects)} resources in namespace [{namespace}], dry run [{dry_run}]")
+
+    def apply(manifest: dict) -> tuple[str, str]:
+        metadata = manifest["metadata"]
+        target_namespace = metadata.get("namespace") or ""
+        try:
+            # Known types resolve through the scheme, others (e.g. custom resources of CRDs applied in an earlier tier)
+            # fall back to discovery
+            if found := find_resource(scheme, manifest["apiVersion"], manifest["kind"]):
+                resource, entry = found
+                api = scheme.handle(client, resource)
+            else:
+                resource, entry = "", None
+                api = client.resources.get(
+                    api_version=manifest["apiVersion"], kind=manifest["kind"])
+            target_namespace = (target_namespace or namespace) if api.namespaced else ""
+            response = api.server_side_apply(
+                body=manifest,
+                name=metadata["name"],
+                namespace=target_namespace or None,
+                field_manager=field_manager,
+                force_conflicts=force_conflicts or None,
+                dry_run="All" if dry_run else None,
+            )
+        except Exception as e:
+            logger.error(
+                f"Error applying {manifest['kind']}/{metadata.get('name')}: {e}")
+            return target_namespace, f"error: {e.summary() if hasattr(e, 'summary') else e}"
+
+        if not dry_run and entry and lc.cache and (watch_cache := lc.cache.watch(resource, api)):
+            watch_cache.upsert(response.to_dict())
+        return target_namespace, "applied (dry run)" if dry_run else "applied"
+
+    def wait_established(crds: list[dict]) -> None:
+        """Wait until the API server serves the custom resources of CRDs, so that later tiers can apply them."""
+        api = client.resources.get(api_version=crds[0]["apiVersion"], kind=crds[0]["kind"])
+        pending = {crd["metadata"]["name"]: crd for crd in crds}
+        deadline = time.monotonic() + crd_established_timeout
+        while pending and time.monotonic() < deadline:
+            for name in list(pending):
+                try:
+                    if is_established(json.loads(api.get(name=name, serialize=False).data)):
+                        del pending[name]
+                except Exception as e:
+                    logger.debug(f"Error getting CustomResourceDefinition {name}: {e}")
+            if pending:
+                time.sleep(0.5)
+        for name, crd in pending.items():
+            logger.warning(f"CustomResourceDefinition {name} is not established after {crd_established_timeout}s")
+            results[id(crd)] = results[id(crd)][0], f"applied, not established after {crd_established_timeout}s"
+        # Discovery fetched before the CRDs existed does not list their custom resources
+        client.resources.invalidate_cache()
+
+    results: dict[int, tuple[str, str]] = {}
+    # Custom resources of CRDs which a dry run does not create cannot be validated by the server
+    undefined = defined_kinds(objects) if dry_run else set()
+    for manifest in objects:
+        # Server-side apply addresses objects by name, `generateName` alone only works with create
+        if not manifest["metadata"].get("name"):
+            results[id(manifest)] = manifest["metadata"].get("namespace") or "", "error: metadata.name is required"
+        elif (manifest["apiVersion"].rpartition("/")[0], manifest["kind"]) in undefined and not find_resource(
+                scheme, manifest["apiVersion"], manifest["kind"]):
+            results[id(manifest)] = (manifest["metadata"].get("namespace") or "",
+                                     "skipped (dry run), its CustomResourceDefinition is not created yet")
+    done = 0
+    # Tiers go one after another, objects within a tier are submitted concurrently, bounded by the cluster limiter
+    for tier in apply_tiers(objects):
+        async def submit(manifest: dict) -> None:
+            results[id(manifest)] = await anyio.to_thread.run_sync(apply, manifest, limiter=lc.limiter)
+
+        async with anyio.create_task_group() as tg:
+            for manifest in tier:
+                if id(manifest) not in results:
+                    tg.start_soon(submit, manifest)
+        crds = [manifest for manifest in tier
+                if manifest["kind"] == "CustomResourceDefinition" and results[id(manifest)][1] == "applied"]
+        if crds:
+            await anyio.to_thread.run_sync(wait_established, crds, limiter=lc.limiter)
+        done += len(tier)
+        await ctx.report_progress(done, len(objects))
+
+    output = ["KIND\tNAME\tNAMESPACE\tRESULT"]
+    for manifest in objects:
+        target_namespace, result = results[id(manifest)]
+        output.append(
+            f"{manifest['kind']}\t{manifest['metadata'].get('name') or '-'}\t{target_namespace or '-'}\t{result}")
+
+    return '\n'.join(output)
 
 
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
+    # `sse` serves many clients from one process, `stdio` serves the client spawning it
+    mcp.run(transport=config["mcp"].get("transport", "stdio"))
@@ -1,56 +1,158 @@
+import time
+import anyio
 from mcp.server.fastmcp import FastMCP
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from anyio import CapacityLimiter
 from loguru import logger
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, nullcontext
 from collections.abc import AsyncIterator
-from dataclasses import dataclass
-from scheme.scheme import parse_api_resources
-from utils.clients import create_dynamic_client
-from utils.models import create_chat_model
-from kubernetes.client.models import V1ParamKind  # type: ignore
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Any
+from collections.abc import Awaitable, Callable
+from scheme.scheme import Scheme, parse_api_resources
+from utils.cache import ResourceCache
+from utils import metrics
+from utils.clients import create_dynamic_client, current_context
+from utils.models import CachedChatModel, LazyChatModel
+from utils.pool import ClusterPool
 from kubernetes.dynamic import DynamicClient  # type: ignore
-from langchain.chat_models.base import BaseChatModel, _ConfigurableModel
 from config.config import config
 
+if TYPE_CHECKING:
+    from langchain.chat_models.base import BaseChatModel, _ConfigurableModel
 
-__all__ = ("create_mcp_server", )
+
+__all__ = ("KopilotMCP", "create_mcp_context", "create_mcp_server", )
 
 
 mcp_config = config["mcp"]
+kubernetes_config = config["kubernetes"]
+http_config = mcp_config.get("http", {})
+metrics_config = mcp_config.get("metrics", {})
 
 
 @dataclass
 class MCPContext:
-    scheme: dict[str, V1ParamKind] | None = None
+    scheme: Scheme | None = None
     client: DynamicClient | None = None
-    llm: BaseChatModel | _ConfigurableModel | None = None
+    llm: "BaseChatModel | _ConfigurableModel | CachedChatModel | LazyChatModel | None" = None
+    cache: ResourceCache | None = None
+    # Bounds blocking Kubernetes calls offloaded to worker threads
+    limiter: CapacityLimiter | None = None
+    # Bounds concurrent tool calls of one client session, unbounded if None
+    session_limiter: CapacityLimiter | None = None
+    # Kubeconfig context of the cluster above, and clusters of other contexts
+    context: str = ""
+    pool: ClusterPool | None = None
+
+
+@asynccontextmanager
+async def create_mcp_context(mcp: FastMCP) -> AsyncIterator[MCPContext]:
+    logger.info("Starting MCP server...")
+    start = time.perf_counter()
 
+    # Phases are independent and mostly wait on the API server, so they run concurrently
+    results: dict[str, Any] = {}
 
-def create_mcp_server() -> FastMCP:
+    async def run_phase(phase: str, func: Callable[[], Awaitable[Any]]) -> None:
+        phase_start = time.perf_counter()
+        results[phase] = await func()
+        logger.info(
+            f"Startup phase [{phase}] took {(time.perf_counter() - phase_start) * 1000:.1f}ms")
 
-    async def on_startup(mcp: FastMCP) -> None:
-        logger.info("Starting MCP server...")
+    # TODO: Exception handling
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(run_phase, "scheme", parse_api_resources)
+        tg.start_soon(run_phase, "client", create_dynamic_client)
+    # Needs both the scheme and the client
+    await run_phase("handles", lambda: anyio.to_thread.run_sync(results["scheme"].warm, results["client"]))
+    cache = ResourceCache.from_config()
+    pool = ClusterPool.from_config()
+    logger.info(
+        f"Started MCP server in {(time.perf_counter() - start) * 1000:.1f}ms")
 
-    async def on_shutdown(mcp: FastMCP) -> None:
+    try:
+        yield MCPContext(
+            scheme=results["scheme"],
+            client=results["client"],
+            # Only create_resource and update_resource need one
+            llm=LazyChatModel(),
+            cache=cache,
+            limiter=CapacityLimiter(
+                kubernetes_config.get("max_concurrency", 16)),
+            context=current_context(),
+            pool=pool,
+        )
+    finally:
+        pool.close()
+        if cache:
+            cache.stop()
         logger.info("Shutting down MCP server...")
 
+
+class KopilotMCP(FastMCP):
+    """
+    FastMCP server which, over SSE, shares one context across all client sessions.
+
+    FastMCP enters the lifespan once per connection, which over SSE would repeat discovery
+    and create new clients for every agent. Instead, the context is created once for the process,
+    and each session gets a view of it with its own limit of concurrent tool calls.
+    """
+
+    shared_context: MCPContext | None = None
+
+    async def run_sse_async(self) -> None:
+        async with create_mcp_context(self) as self.shared_context:
+            await super().run_sse_async()
+
+    async def call_tool(self, name: str, arguments: dict[str, Any]) -> Any:
+        lc = self.get_context().request_context.lifespan_context
+        # Wait for the session limiter outside the span, so that queueing does not count as serialization
+        async with lc.session_limiter if lc and lc.session_limiter else nullcontext():
+            with metrics.span(name) as span:
+                result = await super().call_tool(name, arguments)
+                if span:
+                    span.add_bytes("output", sum(len(getattr(content, "text", "")) for content in result))
+                return result
+
+    def sse_app(self) -> Starlette:
+        app = super().sse_app()
+        if metrics.enabled and metrics_config.get("prometheus", False):
+            async def prometheus(request: Request) -> PlainTextResponse:
+                return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+            app.add_route("/metrics", prometheus, methods=["GET"])
+        return app
+
+
+def create_mcp_server() -> KopilotMCP:
+
     @asynccontextmanager
-    async def mcp_server_lifespan(mcp: FastMCP) -> AsyncIterator[MCPContext]:
-        await on_startup(mcp)
-
-        # TODO: Exception handling
-        scheme = await parse_api_resources()
-        dynamic_client = await create_dynamic_client()
-        llm = await create_chat_model()
-
-        try:
-            yield MCPContext(
-                scheme=scheme,
-                client=dynamic_client,
-                llm=llm
-            )
-        finally:
-            await on_shutdown(mcp)
-
-    mcp = FastMCP(mcp_config["name"], lifespan=mcp_server_lifespan)
+    async def mcp_server_lifespan(mcp: KopilotMCP) -> AsyncIterator[MCPContext]:
+        if mcp.shared_context:
+            logger.debug("Client session connected")
+            yield replace(mcp.shared_context, session_limiter=CapacityLimiter(
+                http_config.get("session_concurrency", 8)))
+            logger.debug("Client session disconnected")
+            return
+
+        async with create_mcp_context(mcp) as context:
+            yield context
+
+    mcp = KopilotMCP(mcp_config["name"], lifespan=mcp_server_lifespan,
+                     host=http_config.get("host", "127.0.0.1"), port=http_config.get("port", 8000))
+
+    if metrics.enabled:
+        @mcp.resource("metrics://tools", mime_type="text/plain")
+        def tool_metrics() -> str:
+            """Calls, errors, latency and where the time and bytes of each tool go, since the server started."""
+            return metrics.render_summary()
+
+        @mcp.resource("metrics://prometheus", mime_type="text/plain")
+        def prometheus_metrics() -> str:
+            """Histograms of tool time by phase and bytes by source, in the Prometheus text format."""
+            return metrics.render_prometheus()
 
     return mcp
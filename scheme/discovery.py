@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+from loguru import logger
+from kubernetes.client import ApiClient  # type: ignore
+from kubernetes.client.rest import ApiException  # type: ignore
+from config.config import config
+
+
+__all__ = ("discover", "load_snapshot", "revalidate", "save_snapshot", "server_version", "snapshot_path", )
+
+
+discovery_config = config["kubernetes"].get("discovery", {})
+
+HTTP_STATUS_NOT_MODIFIED = 304
+
+# Aggregated discovery (GA in 1.30, beta since 1.26) returns every resource of every group in one response,
+# older servers ignore the media type parameters and answer with APIVersions/APIGroupList.
+AGGREGATED_ACCEPT = ",".join((
+    "application/json;g=apidiscovery.k8s.io;v=v2;as=APIGroupDiscoveryList",
+    "application/json;g=apidiscovery.k8s.io;v=v2beta1;as=APIGroupDiscoveryList",
+    "application/json",
+))
+
+ROOT_PATHS = ("/api", "/apis")
+
+
+def _get(api_client: ApiClient, path: str, accept: str = "application/json", etag: str = "") -> tuple[dict | None, str]:
+    """GET a discovery path, returns (body, etag) or (None, etag) if not modified."""
+    header_params = {"Accept": accept}
+    if etag:
+        header_params["If-None-Match"] = etag
+    try:
+        response, _, headers = api_client.call_api(
+            path, "GET",
+            header_params=header_params,
+            auth_settings=["BearerToken"],
+            _preload_content=False,
+            _return_http_data_only=False,
+        )
+    except ApiException as e:
+        if e.status == HTTP_STATUS_NOT_MODIFIED:
+            return None, etag
+        raise
+    return json.loads(response.data), headers.get("ETag", "")
+
+
+def _record(group: str, version: str, name: str, kind: str, namespaced: bool, singular: str, short_names: list[str], verbs: list[str]) -> dict[str, Any]:
+    return {
+        "name": name,
+        "group": group,
+        "version": version,
+        "kind": kind,
+        "namespaced": namespaced,
+        "singular": singular,
+        "short_names": short_names,
+        "verbs": verbs,
+    }
+
+
+def _from_aggregated(body: dict) -> list[dict[str, Any]]:
+    records = []
+    for group in body.get("items", []):
+        group_name = group.get("metadata", {}).get("name", "")
+        # Versions are ordered by preference
+        for version in group.get("versions", []):
+            for res in version.get("resources", []):
+                records.append(_record(
+                    group=group_name,
+                    version=version["version"],
+                    name=res["resource"],
+                    kind=res.get("responseKind", {}).get("kind", ""),
+                    namespaced=res.get("scope") == "Namespaced",
+                    singular=res.get("singularResource", ""),
+                    short_names=res.get("shortNames", []),
+                    verbs=res.get("verbs", []),
+                ))
+    return records
+
+
+def _from_resource_list(group: str, version: str, body: dict) -> list[dict[str, Any]]:
+    return [
+        _record(
+            group=group,
+            version=version,
+            name=res["name"],
+            kind=res["kind"],
+            namespaced=res.get("namespaced", False),
+            singular=res.get("singularName", ""),
+            short_names=res.get("shortNames", []),
+            verbs=res.get("verbs", []),
+        )
+        for res in body.get("resources", [])
+        # Skip subresources such as pods/log
+        if "/" not in res["name"]
+    ]
+
+
+def _legacy_group_versions(path: str, body: dict) -> list[tuple[str, str]]:
+    if path == "/api":
+        return [("", version) for version in body.get("versions", [])]
+    return [
+        (group["name"], version["version"])
+        for group in body.get("groups", [])
+        for version in group.get("versions", [])
+    ]
+
+
+def _dedupe(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    # Keep a resource only from the most preferred version of its group, like `kubectl api-resources`
+    seen: set[tuple[str, str]] = set()
+    deduped = []
+    for record in records:
+        if (key := (record["group"], record["name"])) not in seen:
+            seen.add(key)
+            deduped.append(record)
+    return deduped
+
+
+def discover(api_client: ApiClient, etags: dict[str, str] | None = None) -> tuple[list[dict[str, Any]] | None, dict[str, str]]:
+    """
+    Discover API resources served by the cluster.
+
+    Args:
+        api_client (ApiClient): Kubernetes API client.
+        etags (dict[str, str] | None): ETags of the root paths from a previous discovery.
+
+    Returns:
+        tuple: Resource records (None if nothing changed since `etags`) and the new ETags.
+    """
+    etags = etags or {}
+    workers = int(discovery_config.get("workers", 8))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        roots = dict(zip(ROOT_PATHS, executor.map(
+            lambda path: _get(api_client, path, AGGREGATED_ACCEPT, etags.get(path, "")), ROOT_PATHS)))
+
+        new_etags = {path: etag for path, (_, etag) in roots.items() if etag}
+        if all(body is None for body, _ in roots.values()):
+            return None, new_etags
+
+        records: list[dict[str, Any]] = []
+        legacy: list[tuple[str, str]] = []
+        for path, (body, _) in roots.items():
+            if body is None:
+                # Only one root changed, refetch the other one in full
+                body, _ = _get(api_client, path, AGGREGATED_ACCEPT)
+            if body.get("kind") == "APIGroupDiscoveryList":
+                records.extend(_from_aggregated(body))
+            else:
+                legacy.extend(_legacy_group_versions(path, body))
+
+        # Fall back to one request per group/version, fetched in parallel
+        def fetch(group_version: tuple[str, str]) -> list[dict[str, Any]]:
+            group, version = group_version
+            path = f"/apis/{group}/{version}" if group else f"/api/{version}"
+            try:
+                body, _ = _get(api_client, path)
+            except ApiException as e:
+                # Aggregated APIs (e.g. metrics-server) may be unavailable, skip them like kubectl does
+                logger.warning(f"Failed to discover {path}: {e.status} {e.reason}")
+                return []
+            return _from_resource_list(group, version, body or {})
+
+        for group_records in executor.map(fetch, legacy):
+            records.extend(group_records)
+
+    return _dedupe(records), new_etags
+
+
+def server_version(api_client: ApiClient) -> str:
+    body, _ = _get(api_client, "/version")
+    return (body or {}).get("gitVersion", "")
+
+
+def snapshot_path(api_client: ApiClient, version: str) -> Path:
+    """Snapshot file keyed by cluster (API server URL) and server version."""
+    snapshot_dir = discovery_config.get("snapshot_dir", "") or Path.home() / ".cache" / "kopilot"
+    cluster = hashlib.sha256(
+        api_client.configuration.host.encode()).hexdigest()[:16]
+    return Path(snapshot_dir) / f"discovery-{cluster}-{version}.json"
+
+
+def load_snapshot(path: Path) -> dict[str, Any] | None:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_snapshot(path: Path, records: list[dict[str, Any]], etags: dict[str, str]) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"etags": etags, "resources": records}, f)
+        # Atomic so that a concurrent server start never reads a partial snapshot
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"Failed to save discovery snapshot {path}: {e}")
+
+
+def revalidate(api_client: ApiClient, path: Path, snapshot: dict[str, Any], on_change: Callable[[list[dict[str, Any]]], None]) -> threading.Thread:
+    """Revalidate a snapshot in the background with If-None-Match, call `on_change` with new records if stale."""
+    def run() -> None:
+        try:
+            records, new_etags = discover(api_client, snapshot.get("etags"))
+        except Exception as e:
+            logger.warning(f"Failed to revalidate discovery snapshot: {e}")
+            return
+        # Servers without aggregated discovery send no ETag, compare the content instead
+        if records is None or records == snapshot.get("resources"):
+            logger.debug("Discovery snapshot is up to date")
+            return
+        logger.info("Discovery snapshot is stale, refresh the scheme")
+        save_snapshot(path, records, new_etags)
+        on_change(records)
+
+    thread = threading.Thread(target=run, name="discovery-revalidate", daemon=True)
+    thread.start()
+    return thread
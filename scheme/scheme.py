@@ -1,51 +1,163 @@
-import subprocess
-from typing import Dict
+import time
+import anyio
+from typing import Any
+from loguru import logger
 from kubernetes.client.models import V1ParamKind  # type: ignore
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from scheme.discovery import discover, load_snapshot, revalidate, save_snapshot, server_version, snapshot_path
+from kubernetes.client import ApiClient  # type: ignore
+from kubernetes.dynamic import DynamicClient  # type: ignore
+from kubernetes.dynamic.resource import Resource as DynamicResource  # type: ignore
+from utils.clients import create_api_client
 from config.config import config
 
 
-__all__ = ("parse_api_resources", )
+__all__ = ("Scheme", "find_resource", "load_scheme", "parse_api_resources", )
 
 
-kubernetes_config = config["kubernetes"]
+# Resources whose handles are looked up at startup rather than on first use
+warm_resources = config["kubernetes"].get("discovery", {}).get(
+    "warm_resources", ["pods", "deployments", "services"])
 
 
 @dataclass
 class Resource:
     gvk: V1ParamKind
     is_namespaced: bool
+    singular_name: str = ""
+    short_names: list[str] = field(default_factory=list)
+    verbs: list[str] = field(default_factory=list)
 
 
-async def parse_api_resources() -> dict[str, Resource]:
-    scheme = {}
-
-    # TODO: I don't find a better way to build the scheme using official Python client library for kubernetes.
-    # https://github.com/kubernetes-client/python
-    # I tried discovery client, but I only get group/version pairs.
-    # If you have a better solution, please let me know:)
-    result = subprocess.run(['kubectl', 'api-resources', '--no-headers=true', f'--kubeconfig={kubernetes_config["kubeconfig"]}'],
-                            capture_output=True,
-                            text=True,
-                            check=True)
-
-    for line in result.stdout.splitlines():
-        parts = [part for part in line.strip().split() if part]
-        name = parts[0].strip()
-        api_version = parts[-3].strip()
-        kind = parts[-1].strip()
-        is_namespaced = parts[-2].strip()
-        # TODO: How to deal with duplicate keys? Although it's unlikely to conflict.
-        # Such as:
-        #   events in api/v1
-        #   events in events.k8s.io/v1
-        # One way is use tuple (name, shortnames) as key, but it get complex when we use it.
-        # Besides, they have the same shortnames, ummmmm.
-
-        # TODO: Need to consider shortnames, or maybe we could leave it to guide llm to generate plural only.
-        scheme[name] = Resource(
-            gvk=V1ParamKind(api_version=api_version, kind=kind),
-            is_namespaced=(is_namespaced == 'true'),
-        )
+def _rank(group: str) -> tuple[int, str]:
+    """Preference of a group when names conflict: the core group, then built-in groups, then the rest, by name."""
+    if not group:
+        return 0, group
+    if "." not in group or group.endswith(".k8s.io"):
+        return 1, group
+    return 2, group
 
+
+class Scheme(dict[str, Resource]):
+    """
+    API resources keyed by name, with an index of every name kubectl accepts for them.
+
+    Names of resources served by several groups, e.g. `events` in the core group and in
+    events.k8s.io, go to the preferred group by `_rank`, the others are keyed by their
+    group-qualified name, e.g. `events.events.k8s.io`. Aliases resolve in the same order:
+    plural names first, then singular names and kinds, then short names, so that a short
+    name never shadows the name of another resource.
+
+    It also caches the `DynamicResource` handle of each resource by client, since looking one up
+    scans every discovered resource of the client, and may fetch discovery on a miss.
+    The handles are dropped whenever discovery changes.
+    """
+
+    def __init__(self, records: list[dict[str, Any]]):
+        super().__init__()
+        self.aliases: dict[str, str] = {}
+        self.kinds: dict[tuple[str, str], str] = {}
+        self.handles: dict[tuple[int, str], DynamicResource] = {}
+        self.load(records)
+
+    def load(self, records: list[dict[str, Any]]) -> None:
+        """Replace the resources in place, so that everyone holding the scheme sees the change."""
+        # Versions are discovered by preference, keep the preferred one of every group
+        preferred: dict[tuple[str, str], dict[str, Any]] = {}
+        for record in records:
+            preferred.setdefault((record["group"], record["name"]), record)
+
+        resources: dict[str, Resource] = {}
+        aliases: dict[str, str] = {}
+        kinds: dict[tuple[str, str], str] = {}
+        ranked = sorted(preferred.values(), key=lambda record: _rank(record["group"]))
+        for record in ranked:
+            name, group = record["name"], record["group"]
+            key = f"{name}.{group}" if name in resources else name
+            api_version = f"{group}/{record['version']}" if group else record["version"]
+            resources[key] = Resource(
+                gvk=V1ParamKind(api_version=api_version, kind=record["kind"]),
+                is_namespaced=record["namespaced"],
+                singular_name=record["singular"],
+                short_names=record["short_names"],
+                verbs=record["verbs"],
+            )
+            kinds.setdefault((api_version, record["kind"]), key)
+            aliases[key] = key
+            if group:
+                aliases[f"{name}.{group}"] = key
+                aliases[f"{name}.{record['version']}.{group}"] = key
+
+        for key, record in zip(resources, ranked):
+            aliases.setdefault(record["name"], key)
+        for key, record in zip(resources, ranked):
+            for alias in (record["singular"], record["kind"].lower()):
+                if alias:
+                    aliases.setdefault(alias, key)
+                    if record["group"]:
+                        aliases.setdefault(f"{alias}.{record['group']}", key)
+        for key, record in zip(resources, ranked):
+            for alias in record["short_names"]:
+                aliases.setdefault(alias, key)
+
+        for key in self.keys() - resources.keys():
+            del self[key]
+        self.update(resources)
+        self.aliases, self.kinds = aliases, kinds
+        self.handles = {}
+
+    def resolve(self, name: str) -> str | None:
+        """Key of a resource by any of its names, e.g. `po`, `pod`, `Pod`, `pods` or `deployments.apps`."""
+        if name in self:
+            return name
+        return self.aliases.get(name.strip().lower())
+
+    def handle(self, client: DynamicClient, name: str) -> DynamicResource:
+        """`DynamicResource` of a resource in the scheme, looked up once per client."""
+        handles = self.handles
+        if (handle := handles.get((id(client), name))) is None:
+            gvk = self[name].gvk
+            handle = handles[(id(client), name)] = client.resources.get(api_version=gvk.api_version, kind=gvk.kind)
+        return handle
+
+    def warm(self, client: DynamicClient, names: list[str] | None = None) -> None:
+        """Look up the handles of frequently used resources ahead of the first tool call."""
+        for name in warm_resources if names is None else names:
+            if resource := self.resolve(name):
+                try:
+                    self.handle(client, resource)
+                except Exception as e:
+                    logger.warning(f"Failed to look up resource [{name}]: {e}")
+
+
+def find_resource(scheme: Scheme, api_version: str, kind: str) -> tuple[str, Resource] | None:
+    """Find the resource name and its scheme entry serving objects of a GVK."""
+    if name := scheme.kinds.get((api_version, kind)):
+        return name, scheme[name]
+    return None
+
+
+def load_scheme(api_client: ApiClient) -> Scheme:
+    """Discover API resources of the cluster behind a client, from the snapshot if there is one."""
+    start = time.perf_counter()
+
+    path = snapshot_path(api_client, server_version(api_client))
+    if snapshot := load_snapshot(path):
+        scheme = Scheme(snapshot["resources"])
+
+        # Refresh in place, so that everyone holding the scheme sees the change (e.g. CRDs installed meanwhile)
+        revalidate(api_client, path, snapshot, scheme.load)
+        logger.info(
+            f"Loaded {len(scheme)} API resources from snapshot in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return scheme
+
+    records, etags = discover(api_client)
+    save_snapshot(path, records or [], etags)
+    scheme = Scheme(records or [])
+    logger.info(
+        f"Discovered {len(scheme)} API resources in {(time.perf_counter() - start) * 1000:.1f}ms")
     return scheme
+
+
+async def parse_api_resources() -> Scheme:
+    return await anyio.to_thread.run_sync(lambda: load_scheme(create_api_client()))
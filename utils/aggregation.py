@@ -0,0 +1,90 @@
+import operator
+from collections.abc import Callable
+from typing import Any
+from utils.history import CHARS_PER_TOKEN
+from utils.listing import compile_columns
+
+
+__all__ = ("AGGREGATES", "Aggregation", )
+
+
+AGGREGATES = ("count", "sum", "min", "max")
+
+
+def _number(value: Any) -> float | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _format(value: float) -> str:
+    """Integral values in full, e.g. counts of millions of objects, fractions to six decimals."""
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return f"{value:.6f}".rstrip("0")
+
+
+class Aggregation:
+    """
+    Count, sum, min or max of a field of objects, grouped by other fields, folded one object at a time.
+
+    Only one accumulator per group is kept, so millions of objects cost as much memory as their groups.
+    A count with a field counts the objects which have it. Objects whose field is missing, or for sum, min
+    and max not a number, are counted apart rather than failing the aggregation.
+
+    Raises:
+        ValueError: If the aggregate is unknown, or sum, min or max are given no field.
+    """
+
+    def __init__(self, aggregate: str = "count", field: str = "", group_by: str = ""):
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"Invalid aggregate [{aggregate}], expected one of {', '.join(AGGREGATES)}.")
+        if aggregate != "count" and not field:
+            raise ValueError(f"Aggregate [{aggregate}] needs a field.")
+        self.aggregate = aggregate
+        self.group_by = compile_columns(group_by)
+        self.field = compile_columns(field)[0] if field else None
+        self.fold: Callable[[float, float], float] = {"min": min, "max": max}.get(aggregate, operator.add)
+        self.groups: dict[tuple[str, ...], float] = {}
+        self.count = 0
+        self.skipped = 0
+
+    def add(self, obj: dict) -> None:
+        self.count += 1
+        if not self.field:
+            value: float | None = 1
+        elif self.aggregate == "count":
+            value = None if self.field[1](obj) is None else 1
+        else:
+            value = _number(self.field[1](obj))
+        if value is None:
+            self.skipped += 1
+            return
+        key = tuple("<none>" if (v := getter(obj)) is None else str(v) for _, getter in self.group_by)
+        self.groups[key] = self.fold(self.groups[key], value) if key in self.groups else value
+
+    def render(self, budget: int = 0) -> str:
+        """
+        Groups sorted by their value, largest first, as a tab separated table within a budget of estimated tokens.
+        """
+        header = self.aggregate.upper() if not self.field else f"{self.aggregate.upper()}({self.field[0]})"
+        lines = ["\t".join([*(name for name, _ in self.group_by), header])]
+        size = len(lines[0])
+        rows = sorted(self.groups.items(), key=lambda item: (-item[1], item[0]))
+        for i, (key, value) in enumerate(rows):
+            line = "\t".join([*key, _format(value)])
+            if budget and size + len(line) > budget * CHARS_PER_TOKEN:
+                lines.append(f"\n{len(rows) - i} more groups not shown to stay within the output budget.")
+                break
+            lines.append(line)
+            size += len(line) + 1
+        note = f"{self.count} objects in {len(self.groups)} group{'' if len(self.groups) == 1 else 's'}"
+        if self.skipped:
+            kind = "" if self.aggregate == "count" else "numeric "
+            note += f", {self.skipped} without a {kind}{self.field[0]} left out"  # type: ignore
+        return "\n".join(lines) + f"\n\n{note}."
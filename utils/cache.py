@@ -0,0 +1,221 @@
+import json
+import threading
+import time
+from loguru import logger
+from kubernetes.client.rest import ApiException  # type: ignore
+from kubernetes.dynamic.resource import Resource as DynamicResource  # type: ignore
+from config.config import config as conf
+
+
+__all__ = ("ResourceCache", "WatchCache", )
+
+
+cache_config = conf["kubernetes"].get("cache", {})
+
+HTTP_STATUS_GONE = 410
+
+
+def _rv(obj: dict) -> str:
+    return obj.get("metadata", {}).get("resourceVersion", "")
+
+
+def _key(obj: dict) -> tuple[str, str]:
+    metadata = obj.get("metadata", {})
+    return metadata.get("namespace", ""), metadata.get("name", "")
+
+
+def _is_older(incoming: str, existing: str) -> bool:
+    # resourceVersion is opaque by contract, only compare when both look like integers (etcd revisions)
+    return incoming.isdigit() and existing.isdigit() and int(incoming) < int(existing)
+
+
+class WatchCache:
+    """List+watch cache (informer) of a single resource type across all namespaces."""
+
+    def __init__(self, resource: str, api: DynamicResource, max_items: int, max_staleness: float, watch_timeout: int):
+        self.resource = resource
+        self.api = api
+        self.max_items = max_items
+        self.max_staleness = max_staleness
+        self.watch_timeout = watch_timeout
+
+        self._items: dict[tuple[str, str], dict] = {}
+        self._resource_version = ""
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._synced = False
+        self._watching = False
+        self._overflow = False
+        self._last_contact = 0.0
+        self._thread = threading.Thread(
+            target=self._run, name=f"watch-cache-{resource}", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    @property
+    def fresh(self) -> bool:
+        """Whether reads could be served from memory within the staleness bound."""
+        if not self._synced or self._overflow:
+            return False
+        return self._watching or (time.monotonic() - self._last_contact) <= self.max_staleness
+
+    def list(self, namespace: str = "") -> list[dict] | None:
+        """List cached objects, or None if the cache cannot serve the read."""
+        if not self.fresh:
+            return None
+        with self._lock:
+            if not namespace:
+                return list(self._items.values())
+            return [obj for (ns, _), obj in self._items.items() if ns == namespace]
+
+    def get(self, name: str, namespace: str = "") -> dict | None:
+        """Get a cached object, or None if the cache cannot serve the read or object is absent."""
+        if not self.fresh:
+            return None
+        with self._lock:
+            return self._items.get((namespace, name))
+
+    def upsert(self, obj: dict) -> None:
+        """Write through an object returned by a mutating call."""
+        with self._lock:
+            if self._synced:
+                self._apply("MODIFIED", obj)
+
+    def remove(self, name: str, namespace: str = "") -> None:
+        """Write through a deletion."""
+        with self._lock:
+            self._items.pop((namespace, name), None)
+
+    def _apply(self, event_type: str, obj: dict) -> None:
+        # Drop server-managed bookkeeping, it is never read and dominates object size
+        obj.get("metadata", {}).pop("managedFields", None)
+        key = _key(obj)
+        if event_type == "DELETED":
+            self._items.pop(key, None)
+            return
+        if (existing := self._items.get(key)) and _is_older(_rv(obj), _rv(existing)):
+            return
+        if key not in self._items and len(self._items) >= self.max_items:
+            self._overflow = True
+            self._items.clear()
+            logger.warning(
+                f"Watch cache for [{self.resource}] exceeds {self.max_items} items, fall back to API server")
+            self._stop.set()
+            return
+        self._items[key] = obj
+
+    def _relist(self) -> None:
+        response = self.api.get(serialize=False)
+        data = json.loads(response.data)
+        items = data.get("items", [])
+        kind = self.api.kind
+        api_version = self.api.group_version
+        with self._lock:
+            self._items.clear()
+            for obj in items:
+                # Items in a list response omit kind/apiVersion
+                obj.setdefault("kind", kind)
+                obj.setdefault("apiVersion", api_version)
+                self._apply("ADDED", obj)
+                if self._overflow:
+                    return
+            self._resource_version = data.get(
+                "metadata", {}).get("resourceVersion", "")
+            self._synced = True
+            self._last_contact = time.monotonic()
+        logger.debug(
+            f"Watch cache for [{self.resource}] listed {len(items)} items at resourceVersion {self._resource_version}")
+
+    def _watch(self) -> None:
+        self._watching = True
+        try:
+            for event in self.api.watch(resource_version=self._resource_version, timeout=self.watch_timeout):
+                if self._stop.is_set():
+                    return
+                event_type = event["type"]
+                obj = event["raw_object"]
+                with self._lock:
+                    if event_type != "BOOKMARK":
+                        self._apply(event_type, obj)
+                    self._resource_version = _rv(
+                        obj) or self._resource_version
+                    self._last_contact = time.monotonic()
+        finally:
+            self._watching = False
+            self._last_contact = time.monotonic()
+
+    def _run(self) -> None:
+        backoff = 1.0
+        relist = True
+        while not self._stop.is_set():
+            try:
+                if relist:
+                    self._relist()
+                    relist = False
+                self._watch()
+                backoff = 1.0
+            except ApiException as e:
+                if e.status == HTTP_STATUS_GONE:
+                    logger.debug(
+                        f"Watch cache for [{self.resource}] expired at resourceVersion {self._resource_version}, relist")
+                else:
+                    logger.error(
+                        f"Watch cache for [{self.resource}] failed: {e.status} {e.reason}")
+                    self._stop.wait(backoff)
+                    backoff = min(backoff * 2, 30.0)
+                relist = True
+            except Exception as e:
+                logger.error(f"Watch cache for [{self.resource}] failed: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+                relist = True
+
+
+class ResourceCache:
+    """Watch caches keyed by resource name in the scheme, started lazily on first read."""
+
+    def __init__(self, resources: list[str], max_items: int, max_staleness: float, watch_timeout: int):
+        self.resources = set(resources)
+        self.max_items = max_items
+        self.max_staleness = max_staleness
+        self.watch_timeout = watch_timeout
+        self._caches: dict[str, WatchCache] = {}
+        self._lock = threading.Lock()
+        self._stopped = False
+
+    @classmethod
+    def from_config(cls) -> "ResourceCache | None":
+        if not cache_config.get("enabled", False):
+            return None
+        return cls(
+            resources=list(cache_config.get("resources", [])),
+            max_items=int(cache_config.get("max_items", 50000)),
+            max_staleness=float(cache_config.get("max_staleness", 30)),
+            watch_timeout=int(cache_config.get("watch_timeout", 300)),
+        )
+
+    def watch(self, resource: str, api: DynamicResource) -> WatchCache | None:
+        """Get the watch cache of a resource, or None if the resource is not cached or the caches are stopped."""
+        if resource not in self.resources or "watch" not in getattr(api, "verbs", ["watch"]):
+            return None
+        with self._lock:
+            # A tool still holding an evicted cluster must not start a watch nothing would ever stop
+            if self._stopped:
+                return None
+            if not (cache := self._caches.get(resource)):
+                cache = WatchCache(resource, api, self.max_items,
+                                   self.max_staleness, self.watch_timeout)
+                self._caches[resource] = cache
+                cache.start()
+        return cache
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stopped = True
+            for cache in self._caches.values():
+                cache.stop()
+            self._caches.clear()
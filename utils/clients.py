@@ -1,17 +1,61 @@
+import json
+import time
+import anyio
 from kubernetes import client, config  # type: ignore
 from kubernetes.dynamic import DynamicClient  # type: ignore
+from kubernetes.dynamic.resource import ResourceInstance  # type: ignore
 from kubernetes.client import ApiClient  # type: ignore
 from config.config import config as conf
+from utils.metrics import current_span
 
 
-__all__ = ("create_dynamic_client", )
+__all__ = ("InstrumentedDynamicClient", "create_api_client", "create_dynamic_client", "current_context", )
 
 
 kubernetes_config = conf["kubernetes"]
 
 
-async def create_dynamic_client() -> DynamicClient:
-    return DynamicClient(ApiClient(
-        configuration=config.load_kube_config(
-            config_file=kubernetes_config["kubeconfig"]),
-    ))
+def current_context() -> str:
+    """Name of the kubeconfig context used when none is given."""
+    _, active = config.list_kube_config_contexts(config_file=kubernetes_config["kubeconfig"])
+    return active["name"]
+
+
+def create_api_client(context: str = "") -> ApiClient:
+    configuration = client.Configuration()
+    config.load_kube_config(
+        config_file=kubernetes_config["kubeconfig"], context=context or None, client_configuration=configuration)
+    # Keep a pooled connection for every concurrent call allowed per cluster
+    configuration.connection_pool_maxsize = max(
+        configuration.connection_pool_maxsize, kubernetes_config.get("max_concurrency", 16))
+    return ApiClient(configuration=configuration)
+
+
+class InstrumentedDynamicClient(DynamicClient):
+    """Adds the time and bytes of each request to the span of the tool call making it, if any."""
+
+    def request(self, method, path, body=None, **params):
+        span = current_span()
+        if span is None or params.get("watch"):
+            return super().request(method, path, body, **params)
+
+        serialize = params.pop("serialize", True)
+        serializer = params.pop("serializer", ResourceInstance)
+        start = time.perf_counter()
+        try:
+            response = super().request(method, path, body, serialize=False, **params)
+            data = response.data
+        finally:
+            span.add("k8s", time.perf_counter() - start)
+        span.add_bytes("k8s", len(data))
+        if not serialize:
+            return response
+        try:
+            return serializer(self, json.loads(data))
+        except ValueError:
+            return data.decode("utf8")
+
+
+async def create_dynamic_client(context: str = "") -> DynamicClient:
+    # The constructor runs discovery, keep it off the event loop
+    return await anyio.to_thread.run_sync(lambda: InstrumentedDynamicClient(create_api_client(context)))
@@ -1,71 +1,57 @@
 from datetime import datetime, timezone
+from functools import lru_cache
 
 
 __all__ = (
     "get_age_string",
     "get_ready_count",
+    "parse_timestamp",
     "to_plural",
 )
 
 
-def get_age_string(creation_timestamp):
+@lru_cache(maxsize=8192)
+def parse_timestamp(timestamp: str) -> datetime | None:
+    """Parse an RFC3339 timestamp, cached since the same objects are listed call after call"""
+    try:
+        parsed = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def get_age_string(creation_timestamp, now: datetime | None = None):
     """Convert creation timestamp to human-readable age string"""
     if not creation_timestamp:
         return "Unknown"
 
-    try:
-        # Handle RFC3339 format (2023-01-01T12:00:00Z)
-        if isinstance(creation_timestamp, str):
-            # Try different timestamp formats
-            formats_to_try = [
-                "%Y-%m-%dT%H:%M:%SZ",  # Standard format
-                "%Y-%m-%dT%H:%M:%S.%fZ",  # With microseconds
-                "%Y-%m-%dT%H:%M:%S%z"  # With timezone
-            ]
-
-            for fmt in formats_to_try:
-                try:
-                    creation_time = datetime.strptime(
-                        creation_timestamp, fmt).replace(tzinfo=timezone.utc)
-                    break
-                except ValueError:
-                    continue
-            else:  # If no format matched
-                return "Unknown"
-        else:
-            # If it's already a datetime object
-            creation_time = creation_timestamp
-
-        now = datetime.now(timezone.utc)
+    # Handle RFC3339 format (2023-01-01T12:00:00Z), or a datetime object
+    creation_time = parse_timestamp(creation_timestamp) if isinstance(
+        creation_timestamp, str) else creation_timestamp
+    if creation_time is None:
+        return "Unknown"
 
-        # Calculate the difference
-        diff = now - creation_time
+    # Calculate the difference, against the same `now` for every row of a table
+    diff = (now or datetime.now(timezone.utc)) - creation_time
 
-        # Format the age string
-        days = diff.days
-        hours, remainder = divmod(diff.seconds, 3600)
-        minutes, _ = divmod(remainder, 60)
+    # Format the age string
+    days = diff.days
+    hours, remainder = divmod(diff.seconds, 3600)
+    minutes, _ = divmod(remainder, 60)
 
-        if days > 0:
-            return f"{days}d"
-        elif hours > 0:
-            return f"{hours}h"
-        else:
-            return f"{minutes}m"
-    except Exception as e:
-        print(f"Error parsing timestamp: {e}")
-        return "Unknown"
+    if days > 0:
+        return f"{days}d"
+    elif hours > 0:
+        return f"{hours}h"
+    else:
+        return f"{minutes}m"
 
 
-def get_ready_count(pod):
-    """Get the ready container count as a string like '1/1'"""
-    try:
-        total = len(pod.spec.containers)
-        ready = sum(
-            1 for container in pod.status.containerStatuses if container.ready)
-        return f"{ready}/{total}"
-    except Exception:
-        return "Unknown"
+def get_ready_count(pod: dict):
+    """Get the ready container count of a pod as a string like '1/1'"""
+    containers = (pod.get("spec") or {}).get("containers") or []
+    statuses = (pod.get("status") or {}).get("containerStatuses") or []
+    return f"{sum(1 for status in statuses if status.get('ready'))}/{len(containers)}"
 
 
 def to_plural(word: str) -> str:
@@ -0,0 +1,101 @@
+import json
+from collections.abc import Awaitable, Callable
+from typing import Any
+from loguru import logger
+
+
+__all__ = ("History", "compact_tool_result", "estimate_tokens", )
+
+
+# Rough size of a token in characters of JSON, close enough for English text, YAML and tables
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(messages: list[dict[str, Any]]) -> int:
+    """Estimate the prompt tokens of messages from the length of their JSON."""
+    return sum(len(json.dumps(message, default=str)) for message in messages) // CHARS_PER_TOKEN
+
+
+def compact_tool_result(content: str, max_chars: int) -> str:
+    """
+    Shrink a tool result which the model has already acted upon.
+
+    Tables keep only their NAME column, which is enough to refer back to an object by name or position,
+    anything else is truncated to `max_chars`.
+    """
+    lines = content.splitlines()
+    # Only tables whose first column is NAME, others such as aggregations keep every column
+    if len(lines) > 1 and lines[0].split("\t")[0] == "NAME" and "\t" in lines[0]:
+        content = "\n".join(["NAME", *(line.split("\t")[0] for line in lines[1:] if line.strip())])
+    if len(content) > max_chars:
+        content = f"{content[:max_chars]}\n... ({len(content) - max_chars} characters truncated)"
+    return content
+
+
+class History:
+    """
+    Messages of a conversation kept under a token budget.
+
+    When the estimated tokens exceed the budget, tool results of all but the last `keep_turns` turns
+    are compacted first, then those turns are summarized by `summarize` into one message, or dropped
+    if there is none. The last turns are always kept verbatim, so follow-ups can refer to their results.
+    A turn is a user message with the assistant and tool messages answering it, so compaction never
+    separates a tool call from its result.
+    """
+
+    def __init__(self, system_prompt: dict[str, Any], budget: int = 8000, keep_turns: int = 2,
+                 tool_result_chars: int = 1000,
+                 summarize: Callable[[list[dict[str, Any]]], Awaitable[str]] | None = None):
+        self.system_prompt = system_prompt
+        self.budget = budget
+        self.keep_turns = keep_turns
+        self.tool_result_chars = tool_result_chars
+        self.summarize = summarize
+        self.summary = ""
+        self.turns: list[list[dict[str, Any]]] = []
+
+    @property
+    def messages(self) -> list[dict[str, Any]]:
+        messages = [self.system_prompt]
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"})
+        return messages + [message for turn in self.turns for message in turn]
+
+    def tokens(self) -> int:
+        return estimate_tokens(self.messages)
+
+    def append(self, message: dict[str, Any]) -> None:
+        """Add a message, a user message starts a new turn."""
+        if message["role"] == "user" or not self.turns:
+            self.turns.append([])
+        self.turns[-1].append(message)
+
+    def clear(self) -> None:
+        self.summary = ""
+        self.turns.clear()
+
+    async def compact(self) -> tuple[int, int]:
+        """Bring the history under budget, return the estimated tokens before and after."""
+        before = self.tokens()
+        old = self.turns[:-self.keep_turns] if self.keep_turns else self.turns[:]
+        if before <= self.budget or not old:
+            return before, before
+
+        for turn in old:
+            for message in turn:
+                if message["role"] == "tool" and isinstance(message.get("content"), str):
+                    message["content"] = compact_tool_result(message["content"], self.tool_result_chars)
+        if self.tokens() > self.budget:
+            messages = [message for turn in old for message in turn]
+            if self.summarize:
+                try:
+                    self.summary = await self.summarize(
+                        ([{"role": "system", "content": self.summary}] if self.summary else []) + messages)
+                except Exception as e:
+                    # Dropping the turns still brings the history under budget, at the cost of their details
+                    logger.warning(f"Failed to summarize the conversation, dropping {len(old)} turns: {e}")
+            del self.turns[:len(old)]
+
+        after = self.tokens()
+        logger.debug(f"Compacted history from {before} to {after} estimated tokens")
+        return before, after
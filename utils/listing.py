@@ -0,0 +1,187 @@
+import json
+import re
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any, NamedTuple
+from loguru import logger
+from kubernetes.dynamic.resource import Resource as DynamicResource  # type: ignore
+
+
+__all__ = ("Page", "compile_columns", "iter_pages", "lookup", "match_selectors", "reads_metadata_only", "restarts", )
+
+
+# Ask for metadata only, servers without PartialObjectMetadataList support fall back to full objects
+METADATA_ACCEPT = "application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1,application/json"
+
+
+class Page(NamedTuple):
+    items: list[dict]
+    # Token to fetch the next page, empty if this is the last one
+    continue_token: str
+    # Estimated number of objects after this page, if the server reports it
+    remaining: int | None
+    nbytes: int
+
+
+def iter_pages(api: DynamicResource, namespaced: bool, namespace: str = "", metadata_only: bool = False,
+               limit: int = 0, continue_token: str = "", max_items: int = 0,
+               label_selector: str = "", field_selector: str = "") -> Iterator[Page]:
+    """
+    Page through objects of a resource as plain dicts with limit/continue.
+
+    Args:
+        api (DynamicResource): The resolved dynamic resource.
+        namespaced (bool): Whether the resource is namespaced.
+        namespace (str): The namespace to list, all namespaces if empty.
+        metadata_only (bool): Only fetch `metadata` of each object.
+        limit (int): Page size, unbounded if 0.
+        continue_token (str): Continue token returned by a previous page.
+        max_items (int): Stop after this many objects, unbounded if 0.
+        label_selector (str): Filter objects by labels on the server, e.g. `app=nginx,tier!=db`.
+        field_selector (str): Filter objects by fields on the server, e.g. `status.phase=Running`.
+
+    Yields:
+        Page: The objects of each page.
+    """
+    kwargs: dict = {"serialize": False}
+    if namespaced:
+        kwargs["namespace"] = namespace
+    if metadata_only:
+        kwargs["header_params"] = {"Accept": METADATA_ACCEPT}
+    if label_selector:
+        kwargs["label_selector"] = label_selector
+    if field_selector:
+        kwargs["field_selector"] = field_selector
+
+    count = 0
+    while True:
+        # Never cut a page short, otherwise the continue token would skip the rest of it
+        page_limit = min(filter(None, (limit, max_items - count if max_items else 0)), default=0)
+        # Skip ResourceInstance wrapping, plain dicts are all we need
+        response = api.get(limit=page_limit or None, _continue=continue_token or None, **kwargs)
+        data = response.data
+        body = json.loads(data)
+        items = body["items"]
+        continue_token = body["metadata"].get("continue", "")
+        count += len(items)
+        logger.debug(
+            f"Listed {len(items)} [{api.kind}] in {len(data)} bytes{' (metadata only)' if metadata_only else ''}")
+        yield Page(items, continue_token, body["metadata"].get("remainingItemCount"), len(data))
+        if not continue_token or (max_items and count >= max_items):
+            return
+
+
+def lookup(obj: Any, keys: list[str]) -> Any:
+    """The value at a path of keys or list indices, None if any step is missing."""
+    for key in keys:
+        if isinstance(obj, dict):
+            obj = obj.get(key)
+        elif isinstance(obj, list) and key.isdigit() and int(key) < len(obj):
+            obj = obj[int(key)]
+        else:
+            return None
+    return obj
+
+
+def restarts(obj: dict) -> int:
+    return sum(status.get("restartCount", 0) for status in lookup(obj, ["status", "containerStatuses"]) or [])
+
+
+COLUMN_ALIASES: dict[str, str | Callable[[dict], Any]] = {
+    "namespace": "metadata.namespace",
+    "phase": "status.phase",
+    "status": "status.phase",
+    "node": "spec.nodeName",
+    "ip": "status.podIP",
+    "replicas": "spec.replicas",
+    "restarts": restarts,
+}
+
+
+def compile_columns(columns: str) -> list[tuple[str, Callable[[dict], Any]]]:
+    """
+    Compile comma separated columns into (header, getter) pairs.
+
+    A column is either an alias (namespace, phase, status, node, ip, replicas, restarts)
+    or a dotted field path such as `status.phase` or `spec.containers.0.image`.
+    """
+    compiled = []
+    for column in filter(None, (c.strip() for c in columns.split(","))):
+        path = COLUMN_ALIASES.get(column.lower(), column)
+        if callable(path):
+            compiled.append((column.upper(), path))
+        else:
+            keys = path.split(".")
+            compiled.append((
+                column.upper() if column.lower() in COLUMN_ALIASES else keys[-1].upper(),
+                lambda obj, keys=keys: lookup(obj, keys),
+            ))
+    return compiled
+
+
+def reads_metadata_only(columns: str) -> bool:
+    """Whether the columns only read `metadata`, so objects can be listed without spec and status."""
+    for column in filter(None, (c.strip() for c in columns.split(","))):
+        path = COLUMN_ALIASES.get(column.lower(), column)
+        if callable(path) or not path.startswith("metadata."):
+            return False
+    return True
+
+
+# Requirement of a label selector: `key`, `!key`, `key=v`, `key==v`, `key!=v`, `key in (a,b)`, `key notin (a,b)`
+LABEL_REQUIREMENT = re.compile(
+    r"^\s*(?P<not>!)?\s*(?P<key>[^\s!=(),]+)\s*(?:(?P<op>==|!=|=|\s+in\s+|\s+notin\s+)\s*(?P<value>\([^)]*\)|[^\s,()]*))?\s*$")
+
+
+def _split_requirements(selector: str) -> list[str]:
+    # Commas inside parentheses belong to set-based requirements
+    return [r for r in re.split(r",(?![^(]*\))", selector) if r.strip()]
+
+
+def _compile_label_selector(selector: str) -> list[Callable[[dict], bool]]:
+    matchers = []
+    for requirement in _split_requirements(selector):
+        if not (m := LABEL_REQUIREMENT.match(requirement)):
+            raise ValueError(f"Invalid label selector: {requirement}")
+        key, op, value = m["key"], (m["op"] or "").strip(), m["value"] or ""
+        if m["not"]:
+            matchers.append(lambda labels, key=key: key not in labels)
+        elif not op:
+            matchers.append(lambda labels, key=key: key in labels)
+        elif op in ("in", "notin"):
+            values = {v.strip() for v in value.strip("()").split(",")}
+            matchers.append(lambda labels, key=key, values=values, negate=op == "notin":
+                            (labels.get(key) in values) != negate)
+        else:
+            matchers.append(lambda labels, key=key, value=value, negate=op == "!=":
+                            (labels.get(key) == value) != negate)
+    return matchers
+
+
+def _field_value(value: Any) -> str:
+    """A field as the API server compares it, booleans in lowercase and missing fields as empty strings."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _compile_field_selector(selector: str) -> list[Callable[[dict], bool]]:
+    matchers = []
+    for requirement in _split_requirements(selector):
+        if not (m := re.match(r"^\s*([^\s!=]+)\s*(==|!=|=)\s*(.*?)\s*$", requirement)):
+            raise ValueError(f"Invalid field selector: {requirement}")
+        keys, negate, value = m[1].split("."), m[2] == "!=", m[3]
+        matchers.append(lambda obj, keys=keys, negate=negate, value=value:
+                        (_field_value(lookup(obj, keys)) == value) != negate)
+    return matchers
+
+
+def match_selectors(items: Iterable[dict], label_selector: str = "", field_selector: str = "") -> Iterator[dict]:
+    """Filter objects in memory the way the API server applies label and field selectors."""
+    label_matchers = _compile_label_selector(label_selector)
+    field_matchers = _compile_field_selector(field_selector)
+    for obj in items:
+        labels = obj.get("metadata", {}).get("labels") or {}
+        if all(m(labels) for m in label_matchers) and all(m(obj) for m in field_matchers):
+            yield obj
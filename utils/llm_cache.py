@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+from loguru import logger
+
+
+__all__ = ("LLMCache", )
+
+
+class LLMCache:
+    """Content-addressed LRU cache of LLM responses with TTL, optionally persisted on disk."""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600, cache_dir: str = ""):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    @staticmethod
+    def key(**parts: Any) -> str:
+        """Hash of everything that determines the response, e.g. model, provider, prompt, input and temperature."""
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key) or self._load(key)
+        if entry and time.time() - entry[0] <= self.ttl:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self._entries.pop(key, None)
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value: Any) -> None:
+        entry = (time.time(), value)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._save(key, entry)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+        if self.cache_dir:
+            (self.cache_dir / f"{key}.json").unlink(missing_ok=True)
+
+    def _load(self, key: str) -> tuple[float, Any] | None:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self.cache_dir / f"{key}.json", "r") as f:
+                data = json.load(f)
+            return data["created"], data["value"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save(self, key: str, entry: tuple[float, Any]) -> None:
+        if not self.cache_dir:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_dir / f"{key}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"created": entry[0], "value": entry[1]}, f)
+            os.replace(tmp, self.cache_dir / f"{key}.json")
+
+            # Bound the disk cache by the same number of entries, evicting the oldest
+            files = sorted(self.cache_dir.glob("*.json"), key=os.path.getmtime)
+            for path in files[:max(0, len(files) - self.max_entries)]:
+                path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Failed to persist LLM cache entry: {e}")
+
+    def __str__(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses, {len(self._entries)} entries"
@@ -0,0 +1,115 @@
+import yaml
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any
+
+
+__all__ = ("apply_tiers", "convert_stats", "defined_kinds", "is_established", "parse_manifests", )
+
+
+@dataclass
+class ConvertStats:
+    count: int = 0
+    seconds: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+
+    def __str__(self) -> str:
+        avg = self.seconds / self.count * 1000 if self.count else 0.0
+        return f"{self.count} calls, {avg:.2f}ms avg"
+
+
+# How manifests are converted to JSON, keyed by path ("local" or "llm")
+convert_stats: dict[str, ConvertStats] = defaultdict(ConvertStats)
+
+
+def _validate(doc: Any, api_version: str, kind: str) -> dict:
+    if not isinstance(doc, dict):
+        raise ValueError(f"Manifest is not a mapping: {str(doc)[:80]!r}")
+    # Fill in the type of the requested resource if omitted
+    doc.setdefault("apiVersion", api_version)
+    doc.setdefault("kind", kind)
+    if not isinstance(doc["apiVersion"], str) or not isinstance(doc["kind"], str):
+        raise ValueError("Manifest apiVersion and kind must be strings")
+    if not doc["apiVersion"] or not doc["kind"]:
+        raise ValueError("Manifest apiVersion and kind are required")
+    if not isinstance(metadata := doc.get("metadata"), dict):
+        raise ValueError("Manifest metadata must be a mapping")
+    if not metadata.get("name") and not metadata.get("generateName"):
+        raise ValueError("Manifest metadata.name or metadata.generateName is required")
+    return doc
+
+
+def parse_manifests(text: str, api_version: str = "", kind: str = "") -> list[dict]:
+    """
+    Parse well-formed YAML or JSON manifests, including multi-document YAML.
+
+    Args:
+        text (str): The manifests.
+        api_version (str): apiVersion filled in documents without one.
+        kind (str): kind filled in documents without one.
+
+    Returns:
+        list[dict]: The manifests.
+
+    Raises:
+        ValueError: If the text is not YAML or a document is not shaped like a Kubernetes object.
+    """
+    try:
+        docs = [doc for doc in yaml.safe_load_all(text) if doc is not None]
+    except yaml.YAMLError as e:
+        raise ValueError(f"Malformed YAML: {e}") from e
+    if not docs:
+        raise ValueError("Manifest is empty")
+    # A `kind: List` or a bare sequence of objects
+    if len(docs) == 1 and isinstance(docs[0], list):
+        docs = docs[0]
+    elif len(docs) == 1 and isinstance(docs[0], dict) and docs[0].get("kind") == "List":
+        docs = docs[0].get("items") or []
+    return [_validate(doc, api_version, kind) for doc in docs]
+
+
+# Kinds others depend on, applied before anything else, in this order of tiers.
+# Webhooks and API services come last, so they never intercept the rest of the bundle.
+APPLY_TIERS: tuple[frozenset[str], ...] = (
+    frozenset({"CustomResourceDefinition", "Namespace"}),
+    frozenset({"ResourceQuota", "LimitRange", "PriorityClass", "StorageClass", "PersistentVolume",
+               "ServiceAccount", "ClusterRole", "ClusterRoleBinding", "Role", "RoleBinding",
+               "Secret", "ConfigMap", "PersistentVolumeClaim"}),
+)
+LAST_KINDS = frozenset(
+    {"MutatingWebhookConfiguration", "ValidatingWebhookConfiguration", "APIService"})
+
+
+def apply_tiers(manifests: list[dict]) -> list[list[dict]]:
+    """
+    Group manifests into tiers to apply one after another, objects within a tier do not depend on each other.
+
+    CRDs and Namespaces come first, then config and RBAC, then workloads and custom resources, then webhooks.
+    """
+    tiers: list[list[dict]] = [[] for _ in range(len(APPLY_TIERS) + 2)]
+    for manifest in manifests:
+        kind = manifest["kind"]
+        if kind in LAST_KINDS:
+            tiers[-1].append(manifest)
+            continue
+        index = next((i for i, kinds in enumerate(APPLY_TIERS) if kind in kinds), len(APPLY_TIERS))
+        tiers[index].append(manifest)
+    return [tier for tier in tiers if tier]
+
+
+def defined_kinds(manifests: list[dict]) -> set[tuple[str, str]]:
+    """(group, kind) of the custom resources defined by the CustomResourceDefinitions among manifests."""
+    kinds = set()
+    for manifest in manifests:
+        if manifest["kind"] == "CustomResourceDefinition" and isinstance(spec := manifest.get("spec"), dict):
+            kinds.add((spec.get("group", ""), (spec.get("names") or {}).get("kind", "")))
+    return kinds
+
+
+def is_established(crd: dict) -> bool:
+    """Whether the API server serves the custom resources of a CustomResourceDefinition."""
+    return any(condition.get("type") == "Established" and condition.get("status") == "True"
+               for condition in (crd.get("status") or {}).get("conditions") or [])
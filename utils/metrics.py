@@ -0,0 +1,155 @@
+import bisect
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from loguru import logger
+from config.config import config
+
+
+__all__ = ("Histogram", "Span", "current_span", "enabled", "render_prometheus", "render_summary", "span", )
+
+
+metrics_config = config["mcp"].get("metrics", {})
+enabled: bool = metrics_config.get("enabled", False)
+
+# Upper bounds of histogram buckets, the last bucket is unbounded
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = (1 << 10, 4 << 10, 16 << 10, 64 << 10, 256 << 10, 1 << 20, 4 << 20, 16 << 20, 64 << 20)
+
+# Where a tool call spends its time: in the Kubernetes API, in the LLM, and locally parsing and formatting
+PHASES = ("total", "k8s", "llm", "serialize")
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating within its bucket, like Prometheus `histogram_quantile`."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class Span:
+    """Time and bytes of one tool call, added to from worker threads as its Kubernetes requests complete."""
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.start = time.perf_counter()
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.bytes = {"k8s": 0, "output": 0}
+        self.error = False
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.seconds[phase] += seconds
+
+    def add_bytes(self, source: str, nbytes: int) -> None:
+        with self._lock:
+            self.bytes[source] += nbytes
+
+
+_current: ContextVar[Span | None] = ContextVar("span", default=None)
+
+# Histograms by (tool, phase) and (tool, direction of bytes)
+_seconds: dict[tuple[str, str], Histogram] = {}
+_bytes: dict[tuple[str, str], Histogram] = {}
+_errors: dict[str, int] = {}
+
+
+def current_span() -> Span | None:
+    """Span of the tool call in progress, None if metrics are disabled."""
+    return _current.get()
+
+
+@contextmanager
+def span(tool: str) -> Iterator[Span | None]:
+    """Record a tool call into the histograms, does nothing if metrics are disabled."""
+    if not enabled:
+        yield None
+        return
+
+    current = Span(tool)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException:
+        current.error = True
+        raise
+    finally:
+        _current.reset(token)
+        _record(current)
+
+
+def _record(current: Span) -> None:
+    seconds = current.seconds
+    seconds["total"] = time.perf_counter() - current.start
+    # Kubernetes requests of a tool may run in parallel, so they could add up to more than the total
+    seconds["serialize"] = max(0.0, seconds["total"] - seconds["k8s"] - seconds["llm"])
+    for phase, value in seconds.items():
+        _seconds.setdefault((current.tool, phase), Histogram(SECONDS_BUCKETS)).observe(value)
+    for direction, value in current.bytes.items():
+        _bytes.setdefault((current.tool, direction), Histogram(BYTES_BUCKETS)).observe(value)
+    if current.error:
+        _errors[current.tool] = _errors.get(current.tool, 0) + 1
+    logger.debug(
+        f"Tool [{current.tool}] took {seconds['total'] * 1000:.1f}ms: k8s {seconds['k8s'] * 1000:.1f}ms, "
+        f"llm {seconds['llm'] * 1000:.1f}ms, serialize {seconds['serialize'] * 1000:.1f}ms, "
+        f"{current.bytes['k8s']} bytes from k8s, {current.bytes['output']} bytes output")
+
+
+def _render_histogram(name: str, label: str, histograms: dict[tuple[str, str], Histogram]) -> list[str]:
+    lines = [f"# TYPE {name} histogram"]
+    for (tool, value), histogram in sorted(histograms.items()):
+        labels = f'tool="{tool}",{label}="{value}"'
+        cumulative = 0
+        for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
+
+
+def render_prometheus() -> str:
+    """All histograms and counters in the Prometheus text exposition format."""
+    lines = _render_histogram("kopilot_tool_seconds", "phase", _seconds)
+    lines += _render_histogram("kopilot_tool_bytes", "source", _bytes)
+    lines.append("# TYPE kopilot_tool_errors_total counter")
+    lines += [f'kopilot_tool_errors_total{{tool="{tool}"}} {count}' for tool, count in sorted(_errors.items())]
+    return "\n".join(lines) + "\n"
+
+
+def render_summary() -> str:
+    """One line per tool: calls, errors, latency quantiles, mean time per phase and mean bytes."""
+    output = ["TOOL\tCALLS\tERRORS\tP50\tP99\tK8S\tLLM\tSERIALIZE\tK8S BYTES\tOUTPUT BYTES"]
+    for tool in sorted({tool for tool, _ in _seconds}):
+        total = _seconds[(tool, "total")]
+        means = [_seconds[(tool, phase)].sum / total.count * 1000 for phase in PHASES[1:]]
+        nbytes = [_bytes[(tool, source)].sum / total.count for source in ("k8s", "output")]
+        output.append("\t".join((
+            tool, str(total.count), str(_errors.get(tool, 0)),
+            f"{total.quantile(0.5) * 1000:.1f}ms", f"{total.quantile(0.99) * 1000:.1f}ms",
+            *(f"{mean:.1f}ms" for mean in means), *(f"{mean:.0f}" for mean in nbytes),
+        )))
+    return "\n".join(output)
@@ -1,18 +1,113 @@
-from typing import Union
-from langchain.chat_models import init_chat_model
-from langchain.chat_models.base import BaseChatModel, _ConfigurableModel
+import anyio
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any, Union
+from loguru import logger
+from utils.llm_cache import LLMCache
 from config.config import config
 
+# LangChain takes about as long to import as everything else together, and only a few tools use it
+if TYPE_CHECKING:
+    from langchain.chat_models.base import BaseChatModel, _ConfigurableModel
+    from langchain_core.messages import BaseMessage
 
-__all__ = ("create_chat_model", )
+
+__all__ = ("CachedChatModel", "LazyChatModel", "create_chat_model", )
 
 
 llm_config = config["server"]["llm"]
+cache_config = llm_config.get("cache", {})
+
+
+class CachedChatModel:
+    """
+    Chat model memoizing responses of deterministic calls, anything else is delegated to the wrapped model.
+
+    Callers parsing the response pass `validate`, so that responses failing it are never cached, and cached
+    ones failing it are dropped and asked again.
+    """
+
+    def __init__(self, llm: Union["BaseChatModel", "_ConfigurableModel"], cache: LLMCache, temperature: float):
+        self.llm = llm
+        self.cache = cache
+        self.temperature = temperature
+
+    async def ainvoke(self, messages: list["BaseMessage"], config: dict | None = None,
+                      validate: Callable[[Any], Any] | None = None, **kwargs: Any) -> "BaseMessage":
+        from langchain_core.messages import AIMessage
+
+        # Sampled responses are not meant to be reused
+        if self.temperature > 0:
+            return await self.llm.ainvoke(messages, config=config, **kwargs)
+
+        configurable = (config or {}).get("configurable", {})
+        key = LLMCache.key(
+            model=configurable.get("model"),
+            provider=configurable.get("model_provider"),
+            messages=[(message.type, message.content)
+                      for message in messages],
+            temperature=self.temperature,
+        )
+        if (content := self.cache.get(key)) is not None:
+            try:
+                if validate:
+                    validate(content)
+                logger.debug(f"LLM cache hit, {self.cache}")
+                return AIMessage(content=content)
+            except Exception as e:
+                logger.warning(f"Dropping invalid LLM cache entry: {e}")
+                self.cache.delete(key)
+
+        response = await self.llm.ainvoke(messages, config=config, **kwargs)
+        # Raises to the caller before anything is cached
+        if validate:
+            validate(response.content)
+        self.cache.put(key, response.content)
+        logger.debug(f"LLM cache miss, {self.cache}")
+        return response
 
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
 
-async def create_chat_model() -> Union[BaseChatModel, _ConfigurableModel]:
-    return init_chat_model(
+
+class LazyChatModel:
+    """Chat model created on first call, since only some tools need one."""
+
+    def __init__(self):
+        self.llm: Union["BaseChatModel", "_ConfigurableModel", CachedChatModel, None] = None
+        self._lock = anyio.Lock()
+
+    async def get(self) -> Union["BaseChatModel", "_ConfigurableModel", CachedChatModel]:
+        async with self._lock:
+            if self.llm is None:
+                self.llm = await create_chat_model()
+                logger.debug("Created chat model")
+        return self.llm
+
+    async def ainvoke(self, messages: list["BaseMessage"], config: dict | None = None,
+                      validate: Callable[[Any], Any] | None = None, **kwargs: Any) -> "BaseMessage":
+        llm = await self.get()
+        # Only the cache needs to validate, callers parse uncached responses themselves
+        if validate and isinstance(llm, CachedChatModel):
+            kwargs["validate"] = validate
+        return await llm.ainvoke(messages, config=config, **kwargs)
+
+
+async def create_chat_model() -> Union["BaseChatModel", "_ConfigurableModel", CachedChatModel]:
+    from langchain.chat_models import init_chat_model
+
+    llm = init_chat_model(
         configurable_fields=("model", "model_provider",
                              "base_url", "api_key"),
         temperature=llm_config["temperature"],
     )
+    if not cache_config.get("enabled", False):
+        return llm
+    return CachedChatModel(
+        llm,
+        LLMCache(
+            max_entries=int(cache_config.get("max_entries", 256)),
+            ttl=float(cache_config.get("ttl", 3600)),
+            cache_dir=cache_config.get("dir", ""),
+        ),
+        temperature=float(llm_config["temperature"] or 0),
+    )
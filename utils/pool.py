@@ -0,0 +1,107 @@
+import time
+import anyio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from anyio import CapacityLimiter
+from loguru import logger
+from kubernetes.dynamic import DynamicClient  # type: ignore
+from scheme.scheme import Scheme, load_scheme
+from utils.cache import ResourceCache
+from utils.clients import InstrumentedDynamicClient, create_api_client
+from config.config import config as conf
+
+
+__all__ = ("Cluster", "ClusterPool", )
+
+
+kubernetes_config = conf["kubernetes"]
+pool_config = kubernetes_config.get("pool", {})
+
+
+@dataclass
+class Cluster:
+    scheme: Scheme
+    client: DynamicClient
+    cache: ResourceCache | None
+    # Bounds blocking calls to this cluster, independently of the others
+    limiter: CapacityLimiter
+    last_used: float = field(default_factory=time.monotonic)
+
+
+def create_cluster(context: str) -> tuple[Scheme, DynamicClient, ResourceCache | None]:
+    start = time.perf_counter()
+    api_client = create_api_client(context)
+    scheme = load_scheme(api_client)
+    client = InstrumentedDynamicClient(api_client)
+    scheme.warm(client)
+    logger.info(
+        f"Connected to cluster of context [{context}] in {(time.perf_counter() - start) * 1000:.1f}ms")
+    return scheme, client, ResourceCache.from_config()
+
+
+def close_cluster(context: str, cluster: Cluster) -> None:
+    if cluster.cache:
+        cluster.cache.stop()
+    # Idle connections are closed now, those in use once returned to the closed pool
+    cluster.client.client.rest_client.pool_manager.clear()
+    logger.info(f"Closed cluster of context [{context}]")
+
+
+class ClusterPool:
+    """Clusters by kubeconfig context, connected on first use and evicted when idle or least recently used."""
+
+    def __init__(self, max_clusters: int = 8, idle_ttl: float = 1800, max_concurrency: int = 16, contexts: list[str] | None = None):
+        self.max_clusters = max_clusters
+        self.idle_ttl = idle_ttl
+        self.max_concurrency = max_concurrency
+        # Contexts tools may use, any context of the kubeconfig if None
+        self.contexts = set(contexts) if contexts else None
+        self._clusters: OrderedDict[str, Cluster] = OrderedDict()
+        self._locks: dict[str, anyio.Lock] = {}
+
+    @classmethod
+    def from_config(cls) -> "ClusterPool":
+        return cls(
+            max_clusters=int(pool_config.get("max_clusters", 8)),
+            idle_ttl=float(pool_config.get("idle_ttl", 1800)),
+            max_concurrency=int(kubernetes_config.get("max_concurrency", 16)),
+            contexts=list(pool_config.get("contexts", [])),
+        )
+
+    async def get(self, context: str) -> Cluster:
+        """
+        Get the cluster of a kubeconfig context, connecting to it if needed.
+
+        Raises:
+            ValueError: If the context is not allowed or not in the kubeconfig.
+        """
+        if self.contexts is not None and context not in self.contexts:
+            raise ValueError(f"Context [{context}] is not allowed")
+        self._evict_idle()
+
+        # Concurrent first calls to a cluster connect to it once
+        async with self._locks.setdefault(context, anyio.Lock()):
+            if not (cluster := self._clusters.get(context)):
+                try:
+                    scheme, client, cache = await anyio.to_thread.run_sync(create_cluster, context)
+                except Exception as e:
+                    raise ValueError(f"Failed to connect to context [{context}]: {e}") from e
+                cluster = Cluster(scheme=scheme, client=client, cache=cache,
+                                  limiter=CapacityLimiter(self.max_concurrency))
+                self._clusters[context] = cluster
+                while len(self._clusters) > self.max_clusters:
+                    close_cluster(*self._clusters.popitem(last=False))
+            else:
+                # Under the lock, so that a concurrent call cannot have evicted it in between
+                self._clusters.move_to_end(context)
+            cluster.last_used = time.monotonic()
+        return cluster
+
+    def _evict_idle(self) -> None:
+        now = time.monotonic()
+        for context in [c for c, cluster in self._clusters.items() if now - cluster.last_used > self.idle_ttl]:
+            close_cluster(context, self._clusters.pop(context))
+
+    def close(self) -> None:
+        while self._clusters:
+            close_cluster(*self._clusters.popitem(last=False))
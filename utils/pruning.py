@@ -0,0 +1,131 @@
+import json
+import re
+from typing import Any
+import yaml
+
+
+__all__ = ("Pruner", "dump_yaml", "select_paths", )
+
+
+# Written by the API server or clients for their own bookkeeping, never useful to read
+NOISY_KEYS = frozenset(("managedFields", ))
+NOISY_ANNOTATIONS = frozenset(("kubectl.kubernetes.io/last-applied-configuration", ))
+
+# Fields holding Secret values, shown as their size only
+SECRET_KEYS = frozenset(("data", "stringData"))
+
+Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+class Pruner:
+    """
+    Strips noise from an object and truncates values larger than `max_value_bytes`, in a single pass.
+
+    As the `object_hook` of `json.loads`, every mapping is pruned as soon as it is decoded, so the full
+    object is never built, let alone copied. Objects already decoded, e.g. from the watch cache, are
+    pruned into new mappings by `prune`, leaving the original untouched.
+    """
+
+    def __init__(self, max_value_bytes: int = 1024):
+        self.max_value_bytes = max_value_bytes
+        # Bytes left out, so that the output can say how much was hidden
+        self.pruned_bytes = 0
+        # Original size of truncated values
+        self._sizes: dict[str, int] = {}
+
+    def loads(self, data: bytes | str) -> Any:
+        return json.loads(data, object_hook=self.hook)
+
+    def prune(self, value: Any) -> Any:
+        if isinstance(value, dict):
+            return self.hook({key: self.prune(item) for key, item in value.items()})
+        if isinstance(value, list):
+            return [self.prune(item) for item in value]
+        return value
+
+    def hook(self, obj: dict) -> dict:
+        """Prune a mapping whose children are pruned already."""
+        is_secret = obj.get("kind") == "Secret"
+        pruned = {}
+        for key, value in obj.items():
+            if key in NOISY_KEYS:
+                self.pruned_bytes += _size(value)
+                continue
+            if key == "annotations" and isinstance(value, dict) and (noisy := NOISY_ANNOTATIONS & value.keys()):
+                self.pruned_bytes += sum(_size(value[k]) for k in noisy)
+                value = {k: v for k, v in value.items() if k not in noisy}
+            elif is_secret and key in SECRET_KEYS and isinstance(value, dict):
+                value = {k: f"<{self._secret_size(key, v)} bytes>" for k, v in value.items()}
+            pruned[key] = self.truncate(value)
+        return pruned
+
+    def truncate(self, value: Any) -> Any:
+        if isinstance(value, str) and len(value) > self.max_value_bytes:
+            size = len(value.encode())
+            self.pruned_bytes += size - self.max_value_bytes
+            truncated = f"{value[:self.max_value_bytes]}... ({size} bytes, truncated)"
+            self._sizes[truncated] = size
+            return truncated
+        if isinstance(value, list):
+            return [self.truncate(item) for item in value]
+        return value
+
+    def _secret_size(self, key: str, value: str) -> int:
+        size = self._sizes.get(value, len(value))
+        # Values of `data` are base64 encoded
+        return size * 3 // 4 - value.count("=") if key == "data" else size
+
+
+def _size(value: Any) -> int:
+    return len(value) if isinstance(value, str) else len(json.dumps(value))
+
+
+# A step of a path: `.key`, `['key']` or `["key"]`, `[0]` or `[*]`
+PATH_STEP = re.compile(r"""\.([^.\[\]]+)|\[\s*['"]([^'"]+)['"]\s*\]|\[\s*(\*|-?\d+)\s*\]""")
+
+
+def _parse_path(path: str) -> list[str | int | None]:
+    """Steps of a JSONPath like `{.spec.containers[*].image}`, a key, an index, or None for every item."""
+    path = path.strip().removeprefix("{").removesuffix("}").removeprefix("$")
+    if path and path[0] not in ".[":
+        path = f".{path}"
+    steps: list[str | int | None] = []
+    position = 0
+    for m in PATH_STEP.finditer(path):
+        if m.start() != position:
+            break
+        key, quoted, index = m.groups()
+        steps.append(key if key is not None else quoted if quoted is not None else None if index == "*" else int(index))
+        position = m.end()
+    if position != len(path):
+        raise ValueError(f"Invalid path: {path}")
+    return steps
+
+
+def _select(value: Any, steps: list[str | int | None]) -> Any:
+    for i, step in enumerate(steps):
+        if step is None:
+            return [_select(item, steps[i + 1:]) for item in value] if isinstance(value, list) else None
+        if isinstance(step, int):
+            value = value[step] if isinstance(value, list) and -len(value) <= step < len(value) else None
+        else:
+            value = value.get(step) if isinstance(value, dict) else None
+        if value is None:
+            return None
+    return value
+
+
+def select_paths(obj: dict, paths: str) -> dict[str, Any]:
+    """
+    Subtrees of an object at comma separated JSONPaths, e.g. `.spec.containers[*].image,.status.conditions`.
+
+    Only child steps, indices and `[*]` are supported, which covers what kubectl users write in `-o jsonpath`.
+
+    Raises:
+        ValueError: If a path is malformed.
+    """
+    return {path.strip(): _select(obj, _parse_path(path)) for path in paths.split(",") if path.strip()}
+
+
+def dump_yaml(obj: Any) -> str:
+    return yaml.dump(obj, Dumper=Dumper, sort_keys=False, allow_unicode=True, width=1 << 16)
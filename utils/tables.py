@@ -0,0 +1,165 @@
+from collections.abc import Callable
+from datetime import datetime, timezone
+from typing import Any
+from utils.helpers import get_age_string, get_ready_count
+from utils.history import CHARS_PER_TOKEN
+from utils.listing import compile_columns, lookup, restarts
+
+
+__all__ = ("Table", "create_table", )
+
+
+Column = tuple[str, Callable[[dict], Any]]
+
+
+def _pod_status(pod: dict) -> str:
+    """Status as kubectl shows it, e.g. CrashLoopBackOff or Completed rather than the phase."""
+    if lookup(pod, ["metadata", "deletionTimestamp"]):
+        return "Terminating"
+    for status in lookup(pod, ["status", "containerStatuses"]) or []:
+        state = status.get("state") or {}
+        for reason in (lookup(state, ["waiting", "reason"]), lookup(state, ["terminated", "reason"])):
+            if reason:
+                return reason
+    return lookup(pod, ["status", "reason"]) or lookup(pod, ["status", "phase"]) or "Unknown"
+
+
+def _node_status(node: dict) -> str:
+    ready = next((condition.get("status") for condition in lookup(node, ["status", "conditions"]) or []
+                  if condition.get("type") == "Ready"), None)
+    status = "Ready" if ready == "True" else "NotReady"
+    return f"{status},SchedulingDisabled" if lookup(node, ["spec", "unschedulable"]) else status
+
+
+def _ports(service: dict) -> str:
+    return ",".join(f"{port.get('port')}/{port.get('protocol', 'TCP')}" for port in lookup(service, ["spec", "ports"]) or []) or "<none>"
+
+
+def _ratio(ready: tuple[str, ...], desired: tuple[str, ...], default: int = 0) -> Callable[[dict], str]:
+    return lambda obj: f"{lookup(obj, list(ready)) or 0}/{lookup(obj, list(desired)) or default}"
+
+
+def _field(*keys: str) -> Callable[[dict], Any]:
+    return lambda obj: lookup(obj, list(keys))
+
+
+# Columns after NAME by kind, like `kubectl get`, AGE is added to all of them
+KIND_COLUMNS: dict[str, list[Column]] = {
+    "Pod": [
+        ("READY", get_ready_count),
+        ("STATUS", _pod_status),
+        ("RESTARTS", restarts),
+        ("NODE", _field("spec", "nodeName")),
+    ],
+    "Deployment": [
+        ("READY", _ratio(("status", "readyReplicas"), ("spec", "replicas"))),
+        ("UP-TO-DATE", _field("status", "updatedReplicas")),
+        ("AVAILABLE", _field("status", "availableReplicas")),
+    ],
+    "StatefulSet": [
+        ("READY", _ratio(("status", "readyReplicas"), ("spec", "replicas"))),
+    ],
+    "ReplicaSet": [
+        ("DESIRED", _field("spec", "replicas")),
+        ("CURRENT", _field("status", "replicas")),
+        ("READY", _field("status", "readyReplicas")),
+    ],
+    "DaemonSet": [
+        ("DESIRED", _field("status", "desiredNumberScheduled")),
+        ("READY", _field("status", "numberReady")),
+        ("AVAILABLE", _field("status", "numberAvailable")),
+    ],
+    "Job": [
+        ("COMPLETIONS", _ratio(("status", "succeeded"), ("spec", "completions"), default=1)),
+    ],
+    "Service": [
+        ("TYPE", _field("spec", "type")),
+        ("CLUSTER-IP", _field("spec", "clusterIP")),
+        ("PORT(S)", _ports),
+    ],
+    "Node": [
+        ("STATUS", _node_status),
+        ("VERSION", _field("status", "nodeInfo", "kubeletVersion")),
+    ],
+    "Namespace": [
+        ("STATUS", _field("status", "phase")),
+    ],
+    "PersistentVolumeClaim": [
+        ("STATUS", _field("status", "phase")),
+        ("VOLUME", _field("spec", "volumeName")),
+        ("CAPACITY", _field("status", "capacity", "storage")),
+    ],
+}
+
+
+class Table:
+    """
+    Tab separated rows of objects, rendered one at a time, within a budget of estimated tokens.
+
+    Rows past the budget are counted but not rendered, so the caller can say how many were left out.
+    """
+
+    def __init__(self, columns: list[Column], metadata_only: bool = False, budget: int = 0):
+        self.columns = columns
+        # Whether every column reads only `metadata`, so objects can be listed without spec and status
+        self.metadata_only = metadata_only
+        self.budget = budget * CHARS_PER_TOKEN
+        self.lines = ["\t".join(["NAME", *(header for header, _ in columns)])]
+        self.size = len(self.lines[0])
+        self.omitted = 0
+
+    @property
+    def tokens(self) -> int:
+        return self.size // CHARS_PER_TOKEN
+
+    @property
+    def rows(self) -> int:
+        return len(self.lines) - 1
+
+    def add(self, obj: dict) -> bool:
+        """Render the row of an object, return False once the budget is exhausted."""
+        if self.omitted:
+            self.omitted += 1
+            return False
+        cells = [obj["metadata"]["name"]]
+        for _, getter in self.columns:
+            value = getter(obj)
+            cells.append("<none>" if value is None else str(value))
+        line = "\t".join(cells)
+        if self.budget and self.size + len(line) + 1 > self.budget:
+            self.omitted += 1
+            return False
+        self.lines.append(line)
+        self.size += len(line) + 1
+        return True
+
+    def truncate(self, rows: int) -> None:
+        """Keep the first rows only, e.g. to stop at a page boundary, and forget those left out."""
+        for line in self.lines[rows + 1:]:
+            self.size -= len(line) + 1
+        del self.lines[rows + 1:]
+        self.omitted = 0
+
+    def render(self) -> str:
+        return "\n".join(self.lines)
+
+
+def create_table(kind: str, columns: str = "", all_namespaces: bool = False, budget: int = 0) -> Table:
+    """
+    Table of objects of a kind, with the columns kubectl shows for it, or the given columns instead.
+
+    Args:
+        kind (str): The kind of the objects.
+        columns (str): Comma separated columns replacing those of the kind, see `compile_columns`.
+        all_namespaces (bool): Whether objects come from all namespaces, which adds a NAMESPACE column.
+        budget (int): Estimated tokens of the rendered table, unbounded if 0.
+    """
+    if columns:
+        return Table(compile_columns(columns), budget=budget)
+
+    # Same instant for every row, so ages are consistent and `now` is computed once per table
+    now = datetime.now(timezone.utc)
+    compiled: list[Column] = [("NAMESPACE", _field("metadata", "namespace"))] if all_namespaces else []
+    compiled += KIND_COLUMNS.get(kind, [])
+    compiled.append(("AGE", lambda obj: get_age_string(lookup(obj, ["metadata", "creationTimestamp"]), now)))
+    return Table(compiled, metadata_only=kind not in KIND_COLUMNS, budget=budget)